@@ -0,0 +1,174 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Hashable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from thumbnail_cache import ThumbnailDiskCache
+from thumbnail_service import open_capture
+
+SIGNATURE_SAMPLES = 8  # 每个视频取样的帧数
+SIGNATURE_VERSION = "1"  # 取样或哈希算法变化时修改，使旧缓存失效
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _pack_bits(bits: np.ndarray) -> np.ndarray:
+    """(N, 64) 布尔数组打包为 N 个uint64"""
+    return np.packbits(bits, axis=1).view(">u8").astype(np.uint64).ravel()
+
+
+def frame_hashes(samples: np.ndarray) -> np.ndarray:
+    """计算一组32×32灰度图的感知哈希，返回 (N, 2) uint64：pHash, dHash
+
+    pHash取DCT低频8×8系数与其中位数比较（不含直流分量）；dHash比较9×8缩略图中
+    水平相邻像素的大小。
+    """
+    pixels = samples.astype(np.float32)
+    low = np.stack([cv2.dct(pixel)[:8, :8] for pixel in pixels]).reshape(len(pixels), 64)
+    phash = _pack_bits(low > np.median(low[:, 1:], axis=1, keepdims=True))
+    small = np.stack([cv2.resize(pixel, (9, 8), interpolation=cv2.INTER_AREA) for pixel in pixels])
+    dhash = _pack_bits((small[:, :, 1:] > small[:, :, :-1]).reshape(len(pixels), 64))
+    return np.stack([phash, dhash], axis=1)
+
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    """逐元素统计uint64中为1的位数"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return _POPCOUNT8[values.view(np.uint8)].reshape(values.shape + (8,)).sum(axis=-1)
+
+
+def compute_signature(video_path: str, disk_cache: Optional[ThumbnailDiskCache] = None
+                      ) -> Optional[Tuple[int, np.ndarray]]:
+    """计算视频的 (时长毫秒, (SIGNATURE_SAMPLES, 2) 哈希)，优先读取缓存（可在工作线程中调用）
+
+    取样位置按时长的比例均匀分布，同一内容的不同编码版本取到的是相同的画面。
+    """
+    cached = disk_cache.get_meta(video_path, "signature") if disk_cache else None
+    if cached:
+        version, duration, data = cached.split("|")
+        if version == SIGNATURE_VERSION:
+            return int(duration), np.frombuffer(bytes.fromhex(data), dtype=np.uint64).reshape(-1, 2)
+
+    cap = open_capture(video_path, hw_accel=True)
+    try:
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        if total < SIGNATURE_SAMPLES:
+            return None
+        samples = []
+        frame = None  # 各帧复用同一块解码缓冲区
+        for index in range(SIGNATURE_SAMPLES):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int((index + 0.5) * total / SIGNATURE_SAMPLES))
+            ret, frame = cap.read(frame)
+            if not ret:
+                return None
+            samples.append(cv2.cvtColor(cv2.resize(frame, (32, 32), interpolation=cv2.INTER_AREA),
+                                        cv2.COLOR_BGR2GRAY))
+    finally:
+        cap.release()
+
+    duration_ms = int(total * 1000 / fps) if fps > 0 else 0
+    hashes = frame_hashes(np.stack(samples))
+    if disk_cache:
+        disk_cache.put_meta(video_path, "signature",
+                            f"{SIGNATURE_VERSION}|{duration_ms}|{hashes.tobytes().hex()}")
+    return duration_ms, hashes
+
+
+def find_duplicate_groups(keys: Sequence[Hashable], durations: Sequence[int], hashes: np.ndarray,
+                          max_distance: float = 10.0, duration_tolerance: float = 0.02,
+                          min_tolerance_ms: int = 1000) -> List[List[Hashable]]:
+    """查找近似重复的视频，返回至少两项的分组
+
+    hashes为 (N, SIGNATURE_SAMPLES, 2) 的uint64数组。按时长排序后，每个视频只与时长
+    相近的视频比较：对整段窗口一次性做异或和位计数，取样帧的平均pHash和dHash汉明
+    距离都不超过max_distance即视为重复，再用并查集合并为分组。
+    """
+    count = len(keys)
+    if count < 2:
+        return []
+    durations = np.asarray(durations, dtype=np.int64)
+    order = np.argsort(durations, kind="stable")
+    sorted_durations = durations[order]
+    sorted_hashes = hashes[order]
+    limits = np.maximum(sorted_durations * duration_tolerance, min_tolerance_ms)
+    ends = np.searchsorted(sorted_durations, sorted_durations + limits, side="right")
+
+    parent = list(range(count))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i in range(count - 1):
+        end = int(ends[i])
+        if end <= i + 1:
+            continue
+        distance = popcount(sorted_hashes[i + 1:end] ^ sorted_hashes[i]).mean(axis=1)
+        for j in np.nonzero((distance <= max_distance).all(axis=1))[0]:
+            a, b = find(i), find(i + 1 + int(j))
+            if a != b:
+                parent[b] = a
+
+    groups = {}
+    for i in range(count):
+        groups.setdefault(find(i), []).append(keys[order[i]])
+    return [group for group in groups.values() if len(group) > 1]
+
+
+class DuplicateFinder(QObject):
+    """后台查找近似重复视频
+
+    签名在线程池中计算（OpenCV解码时释放GIL），结果缓存在缩略图磁盘缓存中，
+    再次查找时只需读取缓存和做一次向量化比较。
+    """
+
+    progress = pyqtSignal(int, int)  # 已完成, 总数
+    finished = pyqtSignal(list, bool)  # 重复分组（路径列表的列表）, 是否被取消
+
+    def __init__(self, disk_cache: Optional[ThumbnailDiskCache] = None, max_workers: int = 0):
+        super().__init__()
+        self.disk_cache = disk_cache
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) // 2)
+        self._cancelled = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, paths: List[str]):
+        self._cancelled.clear()
+        self._thread = threading.Thread(target=self._run, args=(list(paths),), daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _signature(self, path: str):
+        if self._cancelled.is_set():
+            return None
+        try:
+            return compute_signature(path, self.disk_cache)
+        except Exception as e:
+            print(f"Error computing signature: {str(e)}")
+            return None
+
+    def _run(self, paths: List[str]):
+        keys, durations, hashes = [], [], []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for done, (path, signature) in enumerate(zip(paths, pool.map(self._signature, paths)), 1):
+                if signature is not None:
+                    keys.append(path)
+                    durations.append(signature[0])
+                    hashes.append(signature[1])
+                self.progress.emit(done, len(paths))
+        if self._cancelled.is_set() or not hashes:
+            self.finished.emit([], self._cancelled.is_set())
+            return
+        self.finished.emit(find_duplicate_groups(keys, durations, np.stack(hashes)), False)
@@ -0,0 +1,342 @@
+import errno
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from fingerprint import same_content
+
+CHUNK_SIZE = 8 * 1024 * 1024
+PART_SUFFIX = ".part"  # 未完成的目标文件，中断后据此续传
+VERIFY_SIZE = 1024 * 1024  # 续传前比对已写入部分末尾的字节数
+FICLONE = 0x40049409  # Linux reflink ioctl
+
+
+class CopyCancelled(Exception):
+    """复制被用户取消"""
+
+
+class CopyControl:
+    """复制任务的暂停/取消控制，可在多个工作线程间共享"""
+
+    def __init__(self):
+        self._running = threading.Event()
+        self._running.set()
+        self._cancelled = threading.Event()
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._running.set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def checkpoint(self):
+        """暂停时阻塞，取消时抛出CopyCancelled"""
+        self._running.wait()
+        if self._cancelled.is_set():
+            raise CopyCancelled()
+
+
+def _try_reflink(src_fd: int, dst_fd: int) -> bool:
+    """尝试写时复制克隆（Btrfs/XFS等），不支持时返回False"""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        import fcntl
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except (ImportError, OSError):
+        return False
+
+
+def _read_at(f, offset: int, length: int) -> bytes:
+    f.seek(offset)
+    return f.read(length)
+
+
+def _resume_offset(fsrc, fpart, src_size: int) -> int:
+    """校验已写入部分的末尾与源文件一致，返回可续传的偏移"""
+    offset = min(os.fstat(fpart.fileno()).st_size, src_size)
+    check = min(offset, VERIFY_SIZE)
+    if check and _read_at(fsrc, offset - check, check) != _read_at(fpart, offset - check, check):
+        return 0
+    return offset
+
+
+def copy_file(src: str, dst: str, control: CopyControl, on_progress=None):
+    """复制单个文件，支持暂停、取消和断点续传
+
+    数据先写入 dst + PART_SUFFIX，完成后原子重命名为dst。优先使用reflink，
+    其次是 copy_file_range / sendfile 内核拷贝，最后退回到用户态分块读写。
+    on_progress(copied, total) 在每个分块后调用。
+    """
+    part = dst + PART_SUFFIX
+    total = os.path.getsize(src)
+    part_fd = os.open(part, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+    with open(src, "rb", buffering=0) as fsrc, os.fdopen(part_fd, "r+b", buffering=0) as fpart:
+        src_fd, dst_fd = fsrc.fileno(), fpart.fileno()
+        offset = _resume_offset(fsrc, fpart, total)
+        if offset == 0 and _try_reflink(src_fd, dst_fd):
+            offset = total
+        fpart.truncate(offset)
+        if on_progress:
+            on_progress(offset, total)
+
+        use_copy_range = hasattr(os, "copy_file_range")
+        use_sendfile = sys.platform.startswith("linux") and hasattr(os, "sendfile")
+        buffer = None
+        while offset < total:
+            control.checkpoint()
+            length = min(CHUNK_SIZE, total - offset)
+            copied = 0
+            if use_copy_range:
+                try:
+                    copied = os.copy_file_range(src_fd, dst_fd, length, offset, offset)
+                except OSError:
+                    use_copy_range = False
+            if not copied and use_sendfile:
+                try:
+                    fpart.seek(offset)
+                    copied = os.sendfile(dst_fd, src_fd, offset, length)
+                except OSError:
+                    use_sendfile = False
+            if not copied:
+                # 用户态分块读写，复用同一块缓冲区
+                if buffer is None:
+                    buffer = memoryview(bytearray(CHUNK_SIZE))
+                fsrc.seek(offset)
+                copied = fsrc.readinto(buffer[:length])
+                if not copied:
+                    raise OSError(f"源文件在复制过程中被截断：{src}")
+                fpart.seek(offset)
+                fpart.write(buffer[:copied])
+            offset += copied
+            if on_progress:
+                on_progress(offset, total)
+
+    control.checkpoint()
+    os.replace(part, dst)
+    shutil.copystat(src, dst)
+
+
+def plan_destinations(names: List[str], target_dir: str) -> List[str]:
+    """为一批文件分配互不冲突的目标路径
+
+    只列一次目标目录建立文件名索引，同名冲突（包括批次内部）按 name_1、name_2
+    依次编号，不再逐个stat。中断后留下的空占位文件和 .part 视为可续传，沿用原名。
+    """
+    taken = set()
+    partials = set()
+    sizes = {}
+    with os.scandir(target_dir) as it:
+        for entry in it:
+            name = os.path.normcase(entry.name)
+            if name.endswith(PART_SUFFIX):
+                partials.add(name[:-len(PART_SUFFIX)])
+            else:
+                taken.add(name)
+                sizes[name] = entry
+    for name in partials & taken:
+        try:
+            if sizes[name].stat().st_size == 0:
+                taken.discard(name)
+        except OSError:
+            pass
+
+    next_suffix = {}  # 基础名 -> 下一个尝试的编号
+    result = []
+    for name in names:
+        base, ext = os.path.splitext(name)
+        key = os.path.normcase(name)
+        candidate = name
+        if key in taken:
+            counter = next_suffix.get(key, 1)
+            candidate = f"{base}_{counter}{ext}"
+            while os.path.normcase(candidate) in taken:
+                counter += 1
+                candidate = f"{base}_{counter}{ext}"
+            next_suffix[key] = counter + 1
+        taken.add(os.path.normcase(candidate))
+        result.append(os.path.join(target_dir, candidate))
+    return result
+
+
+def reserve_destination(path: str) -> str:
+    """以O_EXCL创建空占位文件，防止与其他进程竞争同一文件名
+
+    可续传的空占位文件直接沿用；文件名已被占用时依次尝试 name_1、name_2，
+    返回实际占用的路径。
+    """
+    base, ext = os.path.splitext(path)
+    candidate = path
+    counter = 1
+    while True:
+        try:
+            os.close(os.open(candidate, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o644))
+            return candidate
+        except FileExistsError:
+            if os.path.exists(candidate + PART_SUFFIX) and os.path.getsize(candidate) == 0:
+                return candidate
+        candidate = f"{base}_{counter}{ext}"
+        counter += 1
+
+
+def _discard_reservation(path: str):
+    """未写入任何数据时删除占位文件"""
+    try:
+        if os.path.getsize(path) == 0 and not os.path.exists(path + PART_SUFFIX):
+            os.remove(path)
+    except OSError:
+        pass
+
+
+def move_file(src: str, dst: str, control: CopyControl, on_progress=None):
+    """移动单个文件
+
+    源文件和目标目录在同一设备上时直接原子重命名，否则流式复制后删除源文件。
+    dst 必须是 reserve_destination 占用的路径，重命名会覆盖该占位文件。
+    """
+    total = os.path.getsize(src)
+    if os.stat(src).st_dev == os.stat(os.path.dirname(os.path.abspath(dst))).st_dev:
+        control.checkpoint()
+        try:
+            os.replace(src, dst)
+            if on_progress:
+                on_progress(total, total)
+            return
+        except OSError as e:
+            # 绑定挂载等情况下设备号相同也可能无法重命名
+            if e.errno != errno.EXDEV:
+                raise
+    copy_file(src, dst, control, on_progress)
+    os.remove(src)
+
+
+class CopyEngine(QObject):
+    """后台批量复制/移动引擎
+
+    使用有界线程池并行处理，通过信号报告单文件和总体进度（字节、字节/秒）。
+    目标位置已有内容完全相同的文件时不再复制，直接以该文件作为结果（移动时删除源文件）。
+    """
+
+    file_progress = pyqtSignal(int, object, object, float)  # 序号, 已复制, 总大小, 速度
+    progress = pyqtSignal(object, object, float)  # 已复制, 总大小, 速度
+    file_finished = pyqtSignal(int, str)  # 序号, 目标路径
+    file_skipped = pyqtSignal(int, str)  # 序号, 目标位置已有的相同文件（随后也会发出file_finished）
+    file_failed = pyqtSignal(int, str)  # 序号, 错误信息
+    finished = pyqtSignal(bool)  # 是否被取消
+
+    PROGRESS_INTERVAL = 0.1  # 进度信号的最小间隔（秒）
+
+    def __init__(self, max_workers: int = 2):
+        super().__init__()
+        self.max_workers = max_workers
+        self.control = CopyControl()
+        self.move = False
+        self.existing: List[Optional[str]] = []
+        self._lock = threading.Lock()
+        self._copied = {}
+        self._total = 0
+        self._started = 0.0
+        self._last_emit = 0.0
+
+    def start(self, jobs: List[Tuple[str, str]], move: bool = False, existing: Optional[List[str]] = None):
+        """开始复制（move为True时移动） (源路径, 目标路径) 列表
+
+        existing与jobs一一对应，是目标位置上与源文件同名的路径（因重名而改用了
+        其他目标路径时），该文件内容与源文件相同时跳过复制。
+        """
+        self.control = CopyControl()
+        self.existing = existing or [None] * len(jobs)
+        self.move = move
+        self._copied = {index: 0 for index in range(len(jobs))}
+        self._total = sum(os.path.getsize(src) for src, _ in jobs)
+        self._started = time.monotonic()
+        threading.Thread(target=self._run, args=(jobs,), daemon=True).start()
+
+    def pause(self):
+        self.control.pause()
+
+    def resume(self):
+        self.control.resume()
+
+    def cancel(self):
+        self.control.cancel()
+
+    def _run(self, jobs: List[Tuple[str, str]]):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for index, (src, dst) in enumerate(jobs):
+                pool.submit(self._copy_one, index, src, dst, self.existing[index])
+        self.finished.emit(self.control.cancelled)
+
+    def _copy_one(self, index: int, src: str, dst: str, existing: Optional[str] = None):
+        if self.control.cancelled:
+            return
+        file_started = time.monotonic()
+        resumed_from = [None]
+
+        def on_progress(copied, total):
+            if resumed_from[0] is None:
+                resumed_from[0] = copied
+            now = time.monotonic()
+            with self._lock:
+                self._copied[index] = copied
+                if copied < total and now - self._last_emit < self.PROGRESS_INTERVAL:
+                    return
+                self._last_emit = now
+                done = sum(self._copied.values())
+            file_speed = (copied - resumed_from[0]) / max(now - file_started, 1e-6)
+            self.file_progress.emit(index, copied, total, file_speed)
+            self.progress.emit(done, self._total, done / max(now - self._started, 1e-6))
+
+        if existing and existing != dst and self._skip_identical(index, src, existing, on_progress):
+            return
+        try:
+            dst = reserve_destination(dst)
+        except OSError as e:
+            self.file_failed.emit(index, str(e))
+            return
+        try:
+            (move_file if self.move else copy_file)(src, dst, self.control, on_progress)
+            self.file_finished.emit(index, dst)
+        except CopyCancelled:
+            _discard_reservation(dst)
+        except Exception as e:
+            _discard_reservation(dst)
+            self.file_failed.emit(index, str(e))
+
+    def _skip_identical(self, index: int, src: str, existing: str, on_progress) -> bool:
+        """existing与源文件内容相同时跳过复制（移动时删除源文件），返回是否已跳过"""
+        try:
+            if not os.path.isfile(existing) or not same_content(src, existing, self.control.checkpoint):
+                return False
+            total = os.path.getsize(src)
+            self.control.checkpoint()
+            if self.move:
+                os.remove(src)
+        except CopyCancelled:
+            return True
+        except OSError:
+            # 无法比较时按普通文件复制
+            return False
+        on_progress(total, total)
+        self.file_skipped.emit(index, existing)
+        self.file_finished.emit(index, existing)
+        return True
@@ -0,0 +1,107 @@
+import hashlib
+import mmap
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Optional, Set
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+EDGE_SIZE = 64 * 1024  # 部分哈希读取的文件首尾字节数
+MMAP_CHUNK = 64 * 1024 * 1024  # 完整哈希每次映射的窗口大小（须为ALLOCATIONGRANULARITY的倍数）
+
+
+def partial_hash(path: str) -> str:
+    """文件大小加首尾各EDGE_SIZE字节的BLAKE2哈希
+
+    只读取少量数据，用于快速判断两个路径是否为同一个文件（例如被移动或改名后）。
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        h.update(size.to_bytes(8, "little"))
+        h.update(f.read(EDGE_SIZE))
+        if size > EDGE_SIZE:
+            f.seek(max(EDGE_SIZE, size - EDGE_SIZE))
+            h.update(f.read(EDGE_SIZE))
+    return h.hexdigest()
+
+
+def full_hash(path: str, checkpoint: Optional[Callable[[], None]] = None) -> str:
+    """整个文件内容的BLAKE2哈希
+
+    按MMAP_CHUNK分段映射文件，哈希直接读取映射的内存，不经过Python缓冲区
+    （hashlib在处理大块数据时释放GIL，可在线程池中并行）。checkpoint在每段
+    之前调用，可借此暂停或抛出异常中止。
+    """
+    h = hashlib.blake2b()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        offset = 0
+        while offset < size:
+            if checkpoint:
+                checkpoint()
+            length = min(MMAP_CHUNK, size - offset)
+            with mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ, offset=offset) as view:
+                h.update(view)
+            offset += length
+    return h.hexdigest()
+
+
+def same_content(a: str, b: str, checkpoint: Optional[Callable[[], None]] = None) -> bool:
+    """两个不同的文件内容是否完全相同，依次比较大小、部分哈希和完整哈希
+
+    同一个文件（包括硬链接）返回False，避免调用方把它当作可以删除的副本。
+    """
+    if os.path.samefile(a, b) or os.path.getsize(a) != os.path.getsize(b):
+        return False
+    if partial_hash(a) != partial_hash(b):
+        return False
+    return full_hash(a, checkpoint) == full_hash(b, checkpoint)
+
+
+class FingerprintService(QObject):
+    """后台计算文件指纹的线程池服务
+
+    默认只计算部分哈希（每个文件读取约128KB），full为True时再计算完整哈希。
+    无法读取的文件通过failed信号报告。
+    """
+
+    fingerprinted = pyqtSignal(str, object, str, str)  # 路径, 文件大小, 部分哈希, 完整哈希（未计算时为空）
+    failed = pyqtSignal(str, str)  # 路径, 原因
+
+    def __init__(self, max_workers: int = 0):
+        super().__init__()
+        self.max_workers = max_workers or max(1, min(4, os.cpu_count() or 2))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        self._lock = threading.Lock()
+        self._futures: Set[Future] = set()  # 尚未完成的任务，退出时逐个取消
+
+    def submit(self, paths: Iterable[str], full: bool = False):
+        for path in paths:
+            future = self._pool.submit(self._fingerprint, path, full)
+            with self._lock:
+                self._futures.add(future)
+            future.add_done_callback(self._discard)
+
+    def _discard(self, future: Future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def _fingerprint(self, path: str, full: bool):
+        try:
+            size = os.path.getsize(path)
+            partial = partial_hash(path)
+            digest = full_hash(path) if full else ""
+        except (OSError, ValueError) as e:
+            self.failed.emit(path, str(e))
+            return
+        self.fingerprinted.emit(path, size, partial, digest)
+
+    def shutdown(self):
+        """丢弃尚未开始的任务（不使用Python 3.9才有的cancel_futures参数）"""
+        with self._lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,73 @@
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+from PyQt6.QtGui import QImage
+
+
+def fit_rect(source_size: Tuple[int, int], target_size: Tuple[int, int]) -> Tuple[int, int, int, int]:
+    """保持宽高比把source放进target中央，返回 (x, y, 宽, 高)"""
+    source_w, source_h = source_size
+    target_w, target_h = target_size
+    scale = min(target_w/source_w, target_h/source_h)
+    new_w = max(1, min(target_w, int(source_w * scale)))
+    new_h = max(1, min(target_h, int(source_h * scale)))
+    return (target_w - new_w) // 2, (target_h - new_h) // 2, new_w, new_h
+
+
+def letterbox_into(frame: np.ndarray, canvas: np.ndarray,
+                   rect: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+    """把frame缩放后直接写入canvas中央，不分配中间数组
+
+    canvas四周的黑边由调用方负责（新分配的np.zeros即可）。返回canvas。
+    """
+    canvas_h, canvas_w = canvas.shape[:2]
+    x, y, w, h = rect or fit_rect((frame.shape[1], frame.shape[0]), (canvas_w, canvas_h))
+    roi = canvas[y:y+h, x:x+w]
+    shrinking = w < frame.shape[1]
+    resized = cv2.resize(frame, (w, h), dst=roi,
+                         interpolation=cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR)
+    if resized.__array_interface__["data"][0] != roi.__array_interface__["data"][0]:
+        # 旧版OpenCV无法直接写入非连续的ROI时会返回新数组
+        roi[...] = resized
+    return canvas
+
+
+def wrap_bgr(frame: np.ndarray) -> QImage:
+    """把BGR数组包装为QImage，不复制也不转换颜色
+
+    QImage不持有numpy内存，调用方必须在QImage（及其隐式共享的副本）使用完之前
+    保持frame存活，例如在同一作用域内转换为QPixmap后再丢弃。
+    """
+    height, width = frame.shape[:2]
+    return QImage(frame.data, width, height, frame.strides[0], QImage.Format.Format_BGR888)
+
+
+class LetterboxBuffer:
+    """预分配的letterbox画布
+
+    每帧缩放后直接写入同一块缓冲区，只有源尺寸变化导致位置改变时才重新清空黑边，
+    播放过程中不再分配内存。rgb为True时在缓冲区内原地转换为RGB（供Tk/PIL使用）。
+    """
+
+    def __init__(self, size: Tuple[int, int], rgb: bool = False):
+        width, height = size
+        self.size = size
+        self.rgb = rgb
+        self.canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        self._source_size: Optional[Tuple[int, int]] = None
+        self._rect: Optional[Tuple[int, int, int, int]] = None
+
+    def present(self, frame: np.ndarray) -> np.ndarray:
+        """把frame写入画布并返回画布"""
+        source_size = (frame.shape[1], frame.shape[0])
+        if source_size != self._source_size:
+            self._source_size = source_size
+            self._rect = fit_rect(source_size, self.size)
+            self.canvas.fill(0)
+        letterbox_into(frame, self.canvas, self._rect)
+        if self.rgb:
+            x, y, w, h = self._rect
+            roi = self.canvas[y:y+h, x:x+w]
+            cv2.cvtColor(roi, cv2.COLOR_BGR2RGB, dst=roi)
+        return self.canvas
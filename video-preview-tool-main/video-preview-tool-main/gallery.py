@@ -0,0 +1,211 @@
+import os
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set
+
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtWidgets import QScrollArea, QWidget
+
+
+class VideoRecord:
+    """画廊中一个视频的轻量数据记录，不持有任何界面或解码资源"""
+
+    __slots__ = ("path", "display_name", "selected", "added_at",
+                 "size", "mtime_ns", "duration_ms", "width", "height", "codec", "fps",
+                 "partial_hash", "resume_ms", "auto_resume")
+
+    def __init__(self, path: str, display_name: Optional[str] = None):
+        self.path = path
+        self.display_name = display_name or os.path.basename(path)
+        self.selected = False
+        self.added_at: Optional[float] = None
+        # 以下元数据由后台探测填充，未知时为None
+        self.size: Optional[int] = None
+        self.mtime_ns: Optional[int] = None
+        self.duration_ms: Optional[int] = None
+        self.width: Optional[int] = None
+        self.height: Optional[int] = None
+        self.codec: Optional[str] = None
+        self.fps: Optional[float] = None
+        # 文件首尾内容的哈希，文件被移动后据此找回原记录
+        self.partial_hash: Optional[str] = None
+        # 卡片被回收时的播放状态，重新绑定后恢复（不保存到媒体库）
+        self.resume_ms = 0
+        self.auto_resume = False
+
+
+class VideoGallery(QScrollArea):
+    """虚拟化视频网格
+
+    数据层是 VideoRecord 双端队列，只为视口内的行（加上少量预加载行）创建卡片。
+    滚出视口的卡片解除绑定后回收，供新进入视口的记录复用，因此卡片数量和
+    内存占用与视频总数无关。
+
+    插入和删除只平移受影响的卡片，同一事件循环内的多次修改合并为一次重新布局。
+
+    卡片进入或离开视口（不含预加载行）时调用 set_on_screen(visible)，画廊被挂起
+    （例如主窗口最小化）时所有卡片都视为不可见。
+
+    card_factory 创建的卡片需实现 bind(record)、unbind() 和 set_on_screen(visible)。
+    """
+
+    def __init__(self, card_factory: Callable[[], QWidget], columns: int = 3,
+                 card_size=(490, 340), spacing: int = 20, margin: int = 10, overscan_rows: int = 1):
+        super().__init__()
+        self.card_factory = card_factory
+        self.columns = columns
+        self.card_width, self.card_height = card_size
+        self.spacing = spacing
+        self.margin = margin
+        self.overscan_rows = overscan_rows
+        self.records: Deque[VideoRecord] = deque()
+        self._cells: Dict[int, QWidget] = {}  # 记录索引 -> 已绑定的卡片
+        self._placed: Dict[QWidget, int] = {}  # 卡片 -> 上次摆放时的索引
+        self._free_cards: List[QWidget] = []
+        self._on_screen: Set[QWidget] = set()  # 与视口有交集的卡片
+        self._suspended = False
+        self._relayout_pending = False
+
+        self.setWidgetResizable(False)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.content = QWidget()
+        self.content.setObjectName("gridWidget")
+        self.setWidget(self.content)
+        self.verticalScrollBar().valueChanged.connect(self.update_visible)
+
+    @property
+    def row_height(self) -> int:
+        return self.card_height + self.spacing
+
+    def set_records(self, records: Iterable[VideoRecord]):
+        """替换全部记录"""
+        self._recycle_all()
+        self.records = deque(records)
+        self.schedule_relayout()
+
+    def insert_records(self, records: List[VideoRecord], index: int = 0):
+        """在指定位置插入一批记录，只平移插入点之后的卡片"""
+        if not records:
+            return
+        if index <= 0:
+            index = 0
+            self.records.extendleft(reversed(records))
+        elif index >= len(self.records):
+            index = len(self.records)
+            self.records.extend(records)
+        else:
+            self.records.rotate(-index)
+            self.records.extendleft(reversed(records))
+            self.records.rotate(index)
+        self._shift_cells(index, len(records))
+        self.schedule_relayout()
+
+    def remove_record(self, record: VideoRecord):
+        """移除一条记录，只平移其后的卡片；不在当前视图中（例如被搜索过滤）的记录直接忽略"""
+        try:
+            index = self.records.index(record)
+        except ValueError:
+            return
+        if index in self._cells:
+            self._recycle(index)
+        del self.records[index]
+        self._shift_cells(index + 1, -1)
+        self.schedule_relayout()
+
+    def _shift_cells(self, start: int, delta: int):
+        """索引不小于start的卡片整体平移delta"""
+        self._cells = {
+            (index + delta if index >= start else index): card
+            for index, card in self._cells.items()
+        }
+
+    def schedule_relayout(self):
+        """合并同一事件循环内的多次修改，只重新布局一次"""
+        if not self._relayout_pending:
+            self._relayout_pending = True
+            QTimer.singleShot(0, self.relayout)
+
+    def card_for(self, record: VideoRecord) -> Optional[QWidget]:
+        """返回当前显示该记录的卡片，不在视口内时返回None"""
+        for card in self._cells.values():
+            if card.record is record:
+                return card
+        return None
+
+    def visible_cards(self) -> List[QWidget]:
+        """当前已创建的卡片"""
+        return list(self._cells.values())
+
+    def set_suspended(self, suspended: bool):
+        """挂起时所有卡片都视为离开视口"""
+        self._suspended = suspended
+        self.update_visible()
+
+    def relayout(self):
+        """根据记录数量调整内容高度并刷新可见卡片"""
+        self._relayout_pending = False
+        rows = (len(self.records) + self.columns - 1) // self.columns
+        width = self.viewport().width()
+        height = max(self.viewport().height(), self.margin * 2 + rows * self.row_height - self.spacing)
+        self.content.resize(width, height)
+        self.update_visible()
+
+    def update_visible(self):
+        """只为视口内的行创建/绑定卡片，回收离开视口的卡片"""
+        top = self.verticalScrollBar().value()
+        bottom = top + self.viewport().height()
+        first_row = max(0, (top - self.margin) // self.row_height - self.overscan_rows)
+        last_row = max(0, (bottom - self.margin) // self.row_height + self.overscan_rows)
+        first = first_row * self.columns
+        last = min(len(self.records), (last_row + 1) * self.columns)
+        wanted = range(first, last)
+
+        for index in [i for i in self._cells if i not in wanted]:
+            self._recycle(index)
+
+        for index in wanted:
+            card = self._cells.get(index)
+            if card is None:
+                card = self._free_cards.pop() if self._free_cards else self.card_factory()
+                card.setParent(self.content)
+                card.bind(self.records[index])
+                self._cells[index] = card
+            # 位置未变化的卡片不需要移动
+            if self._placed.get(card) != index:
+                card.move(*self._cell_position(index))
+                self._placed[card] = index
+            card.show()
+
+        # 通知进入或离开视口的卡片，预加载行中的卡片不算在视口内
+        for index, card in self._cells.items():
+            y = self.margin + (index // self.columns) * self.row_height
+            on_screen = not self._suspended and y < bottom and y + self.card_height > top
+            if on_screen != (card in self._on_screen):
+                if on_screen:
+                    self._on_screen.add(card)
+                else:
+                    self._on_screen.discard(card)
+                card.set_on_screen(on_screen)
+
+    def _cell_position(self, index: int):
+        row, col = divmod(index, self.columns)
+        grid_width = self.columns * (self.card_width + self.spacing) - self.spacing
+        x_offset = max(self.margin, (self.viewport().width() - grid_width) // 2)
+        return x_offset + col * (self.card_width + self.spacing), self.margin + row * self.row_height
+
+    def _recycle(self, index: int):
+        card = self._cells.pop(index)
+        self._placed.pop(card, None)
+        self._on_screen.discard(card)
+        card.hide()
+        card.unbind()
+        self._free_cards.append(card)
+
+    def _recycle_all(self):
+        for index in list(self._cells):
+            self._recycle(index)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # 视口宽度变化会改变水平居中偏移，所有卡片都需要重新摆放
+        self._placed.clear()
+        self.relayout()
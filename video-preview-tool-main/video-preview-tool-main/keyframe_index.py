@@ -0,0 +1,118 @@
+import hashlib
+import os
+import threading
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from thumbnail_cache import ThumbnailDiskCache, default_cache_dir
+
+
+class KeyframeIndex:
+    """视频关键帧位置索引
+
+    保存所有关键帧的帧号（升序）。只读取数据包不解码画面，每个文件建立一次后
+    以 .npy 保存在缓存目录中，文件变化后自动重建。
+    """
+
+    def __init__(self, keyframes: np.ndarray, total_frames: int):
+        self.keyframes = keyframes
+        self.total_frames = total_frames
+
+    def floor(self, frame_no: int) -> int:
+        """frame_no 之前（含）最近的关键帧"""
+        i = int(np.searchsorted(self.keyframes, frame_no, side="right")) - 1
+        return int(self.keyframes[max(i, 0)])
+
+    def nearest(self, frame_no: int) -> int:
+        """距离 frame_no 最近的关键帧"""
+        i = int(np.searchsorted(self.keyframes, frame_no))
+        if i >= len(self.keyframes):
+            return int(self.keyframes[-1])
+        if i == 0:
+            return int(self.keyframes[0])
+        before, after = int(self.keyframes[i - 1]), int(self.keyframes[i])
+        return before if frame_no - before <= after - frame_no else after
+
+    @staticmethod
+    def build(video_path: str) -> Optional["KeyframeIndex"]:
+        """扫描视频数据包建立索引，OpenCV不支持读取原始数据包时返回None"""
+        has_key_frame = getattr(cv2, "CAP_PROP_LRF_HAS_KEY_FRAME", None)
+        if has_key_frame is None:
+            return None
+        try:
+            # CAP_PROP_FORMAT=-1 时 grab 只读取数据包，不解码
+            cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+        except (cv2.error, TypeError):
+            return None
+        try:
+            if not cap.isOpened():
+                return None
+            keyframes = []
+            frame_no = 0
+            while cap.grab():
+                if cap.get(has_key_frame):
+                    keyframes.append(frame_no)
+                frame_no += 1
+        finally:
+            cap.release()
+        if not keyframes:
+            return None
+        return KeyframeIndex(np.array(keyframes, dtype=np.int64), frame_no)
+
+    @staticmethod
+    def _cache_file(identity: Tuple[str, int, int], cache_dir: Optional[str] = None) -> str:
+        cache_dir = cache_dir or os.path.join(default_cache_dir(), "keyframes")
+        path, file_size, mtime_ns = identity
+        key = hashlib.sha1(f"{path}|{file_size}|{mtime_ns}".encode("utf-8")).hexdigest()
+        return os.path.join(cache_dir, key + ".npy")
+
+    @staticmethod
+    def load(video_path: str, cache_dir: Optional[str] = None, build: bool = True) -> Optional["KeyframeIndex"]:
+        """读取缓存的索引，没有时建立并写入缓存（在工作线程中调用）
+
+        建立索引需要读取整个文件，build为False时只读取已有的缓存。无法建立索引的
+        文件同样记录在缓存中，不会反复扫描。
+        """
+        identity = ThumbnailDiskCache.file_identity(video_path)
+        if identity is None:
+            return None
+        cache_file = KeyframeIndex._cache_file(identity, cache_dir)
+        cache_dir = os.path.dirname(cache_file)
+        try:
+            data = np.load(cache_file)
+            if len(data) < 2:
+                return None  # 之前建立失败
+            # 最后一个元素保存总帧数
+            return KeyframeIndex(data[:-1], int(data[-1]))
+        except (OSError, ValueError, IndexError):
+            pass
+        if not build:
+            return None
+
+        index = KeyframeIndex.build(video_path)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f"{cache_file}.{threading.get_ident()}.tmp.npy"
+            if index is not None:
+                np.save(tmp, np.append(index.keyframes, index.total_frames))
+            else:
+                np.save(tmp, np.array([-1], dtype=np.int64))
+            os.replace(tmp, cache_file)
+        except OSError as e:
+            print(f"Error saving keyframe index: {str(e)}")
+        return index
+
+    @staticmethod
+    def rename_cache(old_path: str, new_path: str, cache_dir: Optional[str] = None):
+        """文件被移动或改名后，把旧路径的索引缓存转移到新路径"""
+        identity = ThumbnailDiskCache.file_identity(new_path)
+        if identity is None:
+            return
+        old_identity = (os.path.abspath(old_path),) + identity[1:]
+        try:
+            os.replace(KeyframeIndex._cache_file(old_identity, cache_dir),
+                       KeyframeIndex._cache_file(identity, cache_dir))
+        except OSError:
+            pass
@@ -0,0 +1,128 @@
+import os
+import sqlite3
+import time
+from typing import Iterable, List, Optional
+
+from gallery import VideoRecord
+from thumbnail_cache import default_data_dir
+
+# 元数据字段，与 VideoRecord 属性同名
+METADATA_FIELDS = ("size", "mtime_ns", "duration_ms", "width", "height", "codec", "fps")
+
+
+class MediaLibrary:
+    """持久化媒体库索引
+
+    在SQLite中保存画廊里每个视频的路径、排列位置、用户修改的显示名称以及探测到
+    的元数据。启动时直接从索引恢复画廊，不打开任何媒体文件。仅限GUI线程使用。
+
+    后台探测结果（元数据、指纹）逐条到达且数量很大，这类更新不立即提交，累计
+    COMMIT_EVERY条或调用方调用commit()时才一次性写入；其余修改立即提交。
+    """
+
+    COMMIT_EVERY = 256
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.path.join(default_data_dir(), "library.sqlite")
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.db = sqlite3.connect(self.db_path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS videos (
+                path TEXT PRIMARY KEY,
+                position REAL NOT NULL,
+                display_name TEXT NOT NULL,
+                added_at REAL NOT NULL,
+                size INTEGER,
+                mtime_ns INTEGER,
+                duration_ms INTEGER,
+                width INTEGER,
+                height INTEGER,
+                codec TEXT,
+                fps REAL,
+                partial_hash TEXT
+            )
+        """)
+        # 旧版本的索引没有指纹列
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(videos)")}
+        if "partial_hash" not in columns:
+            self.db.execute("ALTER TABLE videos ADD COLUMN partial_hash TEXT")
+        self.db.execute("CREATE INDEX IF NOT EXISTS videos_position ON videos (position)")
+        self.db.commit()
+        self._uncommitted = 0  # 尚未提交的后台更新条数
+
+    def load(self) -> List[VideoRecord]:
+        """按画廊顺序读取全部记录"""
+        records = []
+        rows = self.db.execute(
+            f"SELECT path, display_name, added_at, partial_hash, {', '.join(METADATA_FIELDS)} FROM videos "
+            "ORDER BY position")
+        for row in rows:
+            record = VideoRecord(row[0], row[1])
+            record.added_at = row[2]
+            record.partial_hash = row[3]
+            for field, value in zip(METADATA_FIELDS, row[4:]):
+                setattr(record, field, value)
+            records.append(record)
+        return records
+
+    def add(self, records: Iterable[VideoRecord], at_front: bool = False):
+        """保存新记录，at_front为True时排在最前面（保持传入顺序）"""
+        records = list(records)
+        if not records:
+            return
+        low, high = self.db.execute("SELECT MIN(position), MAX(position) FROM videos").fetchone()
+        if at_front:
+            start = (low if low is not None else 0) - len(records)
+        else:
+            start = (high if high is not None else 0) + 1
+        now = time.time()
+        rows = []
+        for offset, record in enumerate(records):
+            record.added_at = record.added_at or now
+            rows.append((record.path, start + offset, record.display_name, record.added_at))
+        self.db.executemany(
+            "INSERT OR IGNORE INTO videos (path, position, display_name, added_at) VALUES (?, ?, ?, ?)", rows)
+        self.commit()
+
+    def remove(self, path: str):
+        """从索引中移除"""
+        self.db.execute("DELETE FROM videos WHERE path = ?", (path,))
+        self.commit()
+
+    def update_display_name(self, path: str, display_name: str):
+        """保存用户修改的显示名称"""
+        self.db.execute("UPDATE videos SET display_name = ? WHERE path = ?", (display_name, path))
+        self.commit()
+
+    def update_path(self, old_path: str, record: VideoRecord):
+        """文件被移动后更新路径和文件信息"""
+        self.db.execute("UPDATE videos SET path = ?, display_name = ?, size = ?, mtime_ns = ? WHERE path = ?",
+                        (record.path, record.display_name, record.size, record.mtime_ns, old_path))
+        self.commit()
+
+    def update_fingerprint(self, path: str, partial_hash: str):
+        """保存文件的部分哈希，用于识别被移动的文件（延迟提交）"""
+        self.db.execute("UPDATE videos SET partial_hash = ? WHERE path = ?", (partial_hash, path))
+        self._defer_commit()
+
+    def update_metadata(self, record: VideoRecord):
+        """保存探测到的元数据（延迟提交）"""
+        self.db.execute(
+            f"UPDATE videos SET {', '.join(f'{field} = ?' for field in METADATA_FIELDS)} WHERE path = ?",
+            tuple(getattr(record, field) for field in METADATA_FIELDS) + (record.path,))
+        self._defer_commit()
+
+    def _defer_commit(self):
+        self._uncommitted += 1
+        if self._uncommitted >= self.COMMIT_EVERY:
+            self.commit()
+
+    def commit(self):
+        """提交所有尚未写入的修改"""
+        self.db.commit()
+        self._uncommitted = 0
+
+    def close(self):
+        self.commit()
+        self.db.close()
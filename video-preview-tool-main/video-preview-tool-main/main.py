@@ -2,9 +2,10 @@ import sys
 import os
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QPushButton, QLabel, QFileDialog, 
-                            QScrollArea, QGridLayout, QSlider, QLineEdit,
-                            QFrame, QStyle, QSizePolicy, QMessageBox)
-from PyQt6.QtCore import Qt, QSize, QTimer, pyqtSignal
+                            QSlider, QLineEdit,
+                            QFrame, QStyle, QSizePolicy, QMessageBox,
+                            QDialog, QProgressBar, QComboBox)
+from PyQt6.QtCore import Qt, QSize, QTimer, QEvent, pyqtSignal
 from PyQt6.QtGui import QIcon, QPalette, QColor, QPixmap, QImage
 import vlc
 import os
@@ -16,10 +17,24 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from PIL import Image, ImageTk
 import threading
-from typing import List, Dict
+import multiprocessing
+from typing import List, Dict, Optional, Deque, Set
+from collections import deque
 import random
 from datetime import datetime
 from video_player import VideoPlayer
+from vlc_manager import VLCInstanceManager
+from thumbnail_service import ThumbnailService
+from gallery import VideoGallery, VideoRecord
+from playback import PlaybackTicker, PlaybackScheduler
+from file_ops import CopyEngine, plan_destinations
+from media_scanner import DirectoryScanner
+from library import MediaLibrary
+from media_probe import MetadataProber
+from mosaic import MosaicWall, MAX_CLIPS
+from dedup import DuplicateFinder
+from fingerprint import FingerprintService
+from keyframe_index import KeyframeIndex
 import time
 
 class CustomButton(QPushButton):
@@ -65,12 +80,38 @@ class CustomSlider(QSlider):
             }
         """)
 
+# 排序方式：(显示文字, 键)
+SORT_OPTIONS = [
+    ("默认顺序", "default"),
+    ("名称", "name"),
+    ("时长", "duration"),
+    ("分辨率", "resolution"),
+    ("文件大小", "size"),
+    ("修改时间", "mtime"),
+]
+
+# 同时播放的上限：(正常播放数, 后台静音播放数)，总数不超过libvlc播放器池的大小
+# （池满时优先收回已暂停卡片的播放器，正在播放的卡片不会因此被停止）
+PLAYBACK_LIMIT_OPTIONS = [
+    ("单个播放", (1, 0)),
+    ("单个播放+后台静音", (1, 2)),
+    ("同时播放2个", (2, 0)),
+    ("同时播放4个", (4, 0)),
+]
+
 class VideoPreviewWidget(QFrame):
-    def __init__(self, video_path: str, display_name: str = None):
+    """视频卡片，可在画廊中回收并重新绑定到不同的 VideoRecord"""
+    
+    delete_requested = pyqtSignal(object)  # 请求从画廊移除的 VideoRecord
+    display_name_changed = pyqtSignal(object)  # 显示名称被修改的 VideoRecord
+    playback_requested = pyqtSignal(object)  # 用户手动开始播放的 VideoRecord
+    
+    def __init__(self, record: Optional[VideoRecord] = None):
         super().__init__()
-        self.video_path = video_path
-        self.display_name = display_name or os.path.basename(video_path)
-        self.selected = False
+        self.record: Optional[VideoRecord] = None
+        self.player: Optional[VideoPlayer] = None
+        self.scheduler: Optional[PlaybackScheduler] = None  # 由主窗口设置，限制同时播放的卡片数
+        self._auto_paused = False  # 因离开视口而暂停，回到视口后继续播放
         
         # 设置图标路径 - 使用相对路径或默认图标
         self.icons_path = os.path.join(os.path.dirname(__file__), "images")
@@ -79,6 +120,28 @@ class VideoPreviewWidget(QFrame):
             self.icons_path = ""
         
         self.init_ui()
+        if record is not None:
+            self.bind(record)
+            
+    @property
+    def video_path(self) -> str:
+        return self.record.path
+        
+    @property
+    def display_name(self) -> str:
+        return self.record.display_name
+        
+    @display_name.setter
+    def display_name(self, value: str):
+        self.record.display_name = value
+        
+    @property
+    def selected(self) -> bool:
+        return self.record.selected if self.record else False
+        
+    @selected.setter
+    def selected(self, value: bool):
+        self.record.selected = value
         
     def init_ui(self):
         """初始化UI"""
@@ -132,7 +195,7 @@ class VideoPreviewWidget(QFrame):
         name_layout.setSpacing(4)
         
         # 文件名编辑框
-        self.name_edit = QLineEdit(self.display_name)
+        self.name_edit = QLineEdit()
         self.name_edit.setStyleSheet("""
             QLineEdit {
                 border: none;
@@ -226,8 +289,24 @@ class VideoPreviewWidget(QFrame):
         self.preview.setFixedSize(490, 270)
         self.preview.setStyleSheet("background: black; border: none;")
         self.preview.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        # 鼠标在预览区域上移动时按位置显示雪碧图中的帧
+        self.preview.setMouseTracking(True)
+        self.preview.installEventFilter(self)
         layout.addWidget(self.preview)
         
+        # 分辨率和时长角标
+        self.badge = QLabel(self.preview)
+        self.badge.setStyleSheet("""
+            QLabel {
+                background: rgba(0, 0, 0, 0.6);
+                color: white;
+                font-size: 12px;
+                border-radius: 4px;
+                padding: 2px 6px;
+            }
+        """)
+        self.badge.hide()
+        
         # 创建播放组件区域
         controls_container = QWidget()
         controls_container.setFixedHeight(35)
@@ -352,24 +431,81 @@ class VideoPreviewWidget(QFrame):
         # 将播放组件区域添加到主布局
         layout.addWidget(controls_container)
         
-        # 创建播放器
-        self.player = VideoPlayer(self.video_path, self.preview)
-        
         # 连接信号
-        self.play_button.clicked.connect(self.toggle_play)
+        self.play_button.clicked.connect(self.on_play_clicked)
         self.progress.sliderMoved.connect(self.seek)
         self.volume_slider.valueChanged.connect(self.set_volume)
         self.name_edit.editingFinished.connect(self.update_display_name)
         self.speed_button.clicked.connect(self.toggle_speed)
         
-        # 设置定时器更新进度
-        self.update_timer = QTimer()
-        self.update_timer.timeout.connect(self.update_progress)
-        self.update_timer.start(1000)  # 每秒更新一次
+        # 进度由全局定时器统一刷新，只在播放时订阅
+        self.ticker = PlaybackTicker.instance()
         
         # 添加鼠标点击事件
         self.mousePressEvent = self.on_click
         
+    def bind(self, record: VideoRecord):
+        """绑定到一条视频记录并创建播放器"""
+        self.record = record
+        self.name_edit.setText(record.display_name)
+        self.name_edit.setReadOnly(True)
+        self.apply_selected_style()
+        self.player = VideoPlayer(record.path, self.preview)
+        self.player.on_revoked = self.on_player_revoked
+        self.player.events.end_reached.connect(self.on_end_reached)
+        self.player.set_volume(self.volume_slider.value())
+        self.update_metadata_display()
+        # 恢复回收前的播放位置，之前正在播放的在进入视口后继续播放
+        if record.resume_ms:
+            self.player.set_resume_time(record.resume_ms)
+            if record.duration_ms:
+                self.progress.setValue(int(record.resume_ms * 100 / record.duration_ms))
+        self._auto_paused = record.auto_resume
+        record.auto_resume = False
+        
+    def update_metadata_display(self):
+        """显示媒体库中记录的分辨率和时长"""
+        parts = []
+        if self.record.height:
+            parts.append("4K" if self.record.height >= 2160 else f"{self.record.height}p")
+        if self.record.duration_ms:
+            seconds = self.record.duration_ms / 1000
+            parts.append(time.strftime("%H:%M:%S" if seconds >= 3600 else "%M:%S", time.gmtime(seconds)))
+            if not self.player.is_playing:
+                total_str = time.strftime("%M:%S", time.gmtime(seconds))
+                self.time_label.setText(f"00:00 / {total_str}")
+        if parts:
+            self.badge.setText(" · ".join(parts))
+            self.badge.adjustSize()
+            self.badge.move(self.preview.width() - self.badge.width() - 8, 8)
+            self.badge.show()
+        else:
+            self.badge.hide()
+        
+    def update_video_path(self):
+        """记录中的文件路径变化后（例如被移动）刷新播放器和文件名"""
+        self.ticker.unsubscribe(self)
+        self.player.set_video_path(self.record.path)
+        self.on_player_revoked()
+        self.progress.setValue(0)
+        self.name_edit.setText(self.record.display_name)
+        
+    def unbind(self):
+        """释放播放器并恢复为未绑定状态，供画廊回收复用"""
+        if self.player is not None:
+            self.record.resume_ms = self.player.get_resume_time()
+            self.record.auto_resume = self.player.is_playing or self._auto_paused
+            self.player.events.end_reached.disconnect(self.on_end_reached)
+            self.player.cleanup()
+            self.player = None
+        self._auto_paused = False
+        self.on_player_revoked()
+        self.progress.setValue(0)
+        self.time_label.setText("00:00 / 00:00")
+        self.speed_button.setText("1.0x")
+        self.badge.hide()
+        self.record = None
+        
     def update_select_button(self):
         """更新选择按钮的样式"""
         self.select_btn.setStyleSheet(f"""
@@ -396,6 +532,10 @@ class VideoPreviewWidget(QFrame):
     def toggle_select(self):
         """切换选中状态"""
         self.selected = not self.selected
+        self.apply_selected_style()
+        
+    def apply_selected_style(self):
+        """根据记录的选中状态刷新卡片样式"""
         self.setProperty("selected", self.selected)
         self.name_edit.setProperty("selected", self.selected)
         
@@ -412,6 +552,15 @@ class VideoPreviewWidget(QFrame):
         self.name_edit.style().unpolish(self.name_edit)
         self.name_edit.style().polish(self.name_edit)
         
+    def eventFilter(self, obj, event):
+        """预览区域的悬停预览"""
+        if obj is self.preview and self.player is not None:
+            if event.type() == QEvent.Type.MouseMove:
+                self.player.scrub(event.position().x() / max(1, self.preview.width()))
+            elif event.type() == QEvent.Type.Leave:
+                self.player.end_scrub()
+        return super().eventFilter(obj, event)
+        
     def on_click(self, event):
         """处理鼠标点击事件"""
         self.toggle_select()
@@ -425,20 +574,73 @@ class VideoPreviewWidget(QFrame):
         self.player.set_playback_speed(next_speed)
         
     def toggle_play(self):
+        self._auto_paused = False
         if not self.player.is_playing:
             self.player.play()
             if self.icons_path:
                 self.play_button.setIcon(QIcon(os.path.join(self.icons_path, "pause.png")))
             else:
                 self.play_button.setText("⏸")
-            self.update_timer.start()
+            self.ticker.subscribe(self, self.update_progress)
+            if self.scheduler is not None:
+                self.scheduler.started(self)
         else:
             self.player.pause()
             if self.icons_path:
                 self.play_button.setIcon(QIcon(os.path.join(self.icons_path, "play.png")))
             else:
                 self.play_button.setText("▶")
-            self.update_timer.stop()
+            self.ticker.unsubscribe(self)
+            if self.scheduler is not None:
+                self.scheduler.stopped(self)
+            
+    def on_play_clicked(self):
+        """用户点击播放按钮"""
+        self.toggle_play()
+        if self.player.is_playing:
+            self.playback_requested.emit(self.record)
+            
+    def cancel_auto_resume(self):
+        """用户开始播放其他视频后，不再在回到视口时自动继续"""
+        self._auto_paused = False
+        
+    def set_on_screen(self, visible: bool):
+        """画廊通知卡片进入或离开视口：离开时暂停解码，回来后从原位置继续"""
+        if not visible:
+            if self.player is not None and self.player.is_playing:
+                self.toggle_play()
+                self._auto_paused = True
+        elif self._auto_paused:
+            self._auto_paused = False
+            if self.player is not None and not self.player.is_playing:
+                self.toggle_play()
+            
+    def pause_playback(self):
+        """调度器要求让出播放名额"""
+        if self.player is not None and self.player.is_playing:
+            self.toggle_play()
+            
+    def set_background(self, background: bool):
+        """调度器把卡片转入后台（静音）或恢复前台播放"""
+        if self.player is not None:
+            self.player.set_muted(background)
+            
+    def on_player_revoked(self):
+        """播放器被其他卡片抢占后恢复为未播放状态"""
+        if self.icons_path:
+            self.play_button.setIcon(QIcon(os.path.join(self.icons_path, "play.png")))
+        else:
+            self.play_button.setText("▶")
+        self.ticker.unsubscribe(self)
+        if self.scheduler is not None:
+            self.scheduler.stopped(self)
+        
+    def on_end_reached(self):
+        """播放结束后回到缩略图"""
+        if self.player is not None:
+            self.player.stop()
+        self.on_player_revoked()
+        self.progress.setValue(0)
             
     def seek(self, value):
         self.player.seek(value)
@@ -449,7 +651,7 @@ class VideoPreviewWidget(QFrame):
         
     def update_progress(self):
         """更新进度条和时间显示"""
-        if self.player.is_playing:
+        if self.player.is_playing and not self.progress.isSliderDown():
             current_time = self.player.get_time()
             total_time = self.player.get_duration()
             if total_time > 0:
@@ -479,16 +681,13 @@ class VideoPreviewWidget(QFrame):
                 new_name += ext
             self.display_name = new_name
             self.name_edit.setText(new_name)
+            self.display_name_changed.emit(self.record)
         self.name_edit.setReadOnly(True)  # 恢复只读状态
         
     def delete_video(self):
         """从界面中移除视频卡片（不删除实际文件）"""
-        self.player.cleanup()
-        self.deleteLater()
-        # 发送信号通知主窗口更新布局
-        parent = self.parent()
-        if parent and hasattr(parent, 'update_grid_layout'):
-            parent.update_grid_layout()
+        # 发送信号通知主窗口更新画廊，卡片本身由画廊回收
+        self.delete_requested.emit(self.record)
         
     def get_current_info(self):
         """获取当前视频信息"""
@@ -499,16 +698,90 @@ class VideoPreviewWidget(QFrame):
         }
         
     def closeEvent(self, event):
-        self.player.cleanup()
+        if self.player is not None:
+            self.player.cleanup()
         super().closeEvent(event)
 
+def format_size(num_bytes: float) -> str:
+    """格式化字节数"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if num_bytes < 1024:
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} TB"
+
+class CopyProgressDialog(QDialog):
+    """批量复制进度对话框，支持暂停和取消"""
+    
+    def __init__(self, engine: CopyEngine, names: List[str], title: str = "正在复制", parent=None):
+        super().__init__(parent)
+        self.engine = engine
+        self.names = names
+        self.cancelled = False
+        self.setWindowTitle(title)
+        self.setModal(True)
+        self.setMinimumWidth(420)
+        
+        layout = QVBoxLayout(self)
+        self.file_label = QLabel("准备中...")
+        self.file_bar = QProgressBar()
+        self.total_label = QLabel("")
+        self.total_bar = QProgressBar()
+        layout.addWidget(self.file_label)
+        layout.addWidget(self.file_bar)
+        layout.addWidget(self.total_label)
+        layout.addWidget(self.total_bar)
+        
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        self.pause_button = QPushButton("暂停")
+        self.pause_button.clicked.connect(self.toggle_pause)
+        self.cancel_button = QPushButton("取消")
+        self.cancel_button.clicked.connect(self.reject)
+        button_layout.addWidget(self.pause_button)
+        button_layout.addWidget(self.cancel_button)
+        layout.addLayout(button_layout)
+        
+        engine.file_progress.connect(self.on_file_progress)
+        engine.progress.connect(self.on_progress)
+        engine.finished.connect(self.on_finished)
+        
+    def on_file_progress(self, index, copied, total, speed):
+        """更新当前文件进度"""
+        self.file_label.setText(f"{self.names[index]}    {format_size(speed)}/s")
+        self.file_bar.setValue(int(copied * 100 / total) if total else 100)
+        
+    def on_progress(self, copied, total, speed):
+        """更新总体进度"""
+        self.total_label.setText(f"{format_size(copied)} / {format_size(total)}    {format_size(speed)}/s")
+        self.total_bar.setValue(int(copied * 100 / total) if total else 100)
+        
+    def toggle_pause(self):
+        """暂停/继续复制"""
+        if self.engine.control.paused:
+            self.engine.resume()
+            self.pause_button.setText("暂停")
+        else:
+            self.engine.pause()
+            self.pause_button.setText("继续")
+            
+    def reject(self):
+        """取消复制，等待工作线程退出后再关闭"""
+        self.cancelled = True
+        self.engine.cancel()
+        self.pause_button.setEnabled(False)
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.setText("正在取消...")
+        
+    def on_finished(self, cancelled):
+        self.cancelled = cancelled
+        self.done(0 if cancelled else 1)
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("视频预览工具")
         self.setMinimumSize(1200, 800)
-        self.videos = []
-        self.selected_videos = []
         self.movie_quotes = [
             "生活就像巧克力盒，你永远不知道下一颗是什么味道。 —《阿甘正传》",
             "希望是好事，也许是最好的，好事不会消亡。 —《肖申克的救赎》",
@@ -528,8 +801,41 @@ class MainWindow(QMainWindow):
         ]
         self.current_quote_index = 0
         self.is_all_selected = False
+        self.videos: Deque[VideoRecord] = deque()  # 媒体库中的全部记录（画廊只显示筛选排序后的部分）
+        self.records_by_path: Dict[str, VideoRecord] = {}
+        self.records_by_hash: Dict[str, List[VideoRecord]] = {}  # 部分哈希 -> 记录（可能包含已删除的记录）
+        self.relink_candidates: Set[str] = set()  # 本次新导入、可以接替丢失记录的路径
+        self.duplicate_groups: Optional[List[List[VideoRecord]]] = None  # 不为None时画廊只显示重复分组
+        
+        # 限制同时播放的卡片数，开始播放新卡片时暂停（或转入后台）最久未操作的那个
+        self.scheduler = PlaybackScheduler(*PLAYBACK_LIMIT_OPTIONS[0][1])
         self.setup_ui()
         
+        # 媒体库索引和后台元数据探测
+        self.library = MediaLibrary()
+        # 探测结果和指纹批量提交，导入大量文件时GUI线程不必逐条写盘
+        self.library_commit_timer = QTimer(self)
+        self.library_commit_timer.setSingleShot(True)
+        self.library_commit_timer.setInterval(500)
+        self.library_commit_timer.timeout.connect(self.library.commit)
+        self.prober = MetadataProber()
+        self.prober.probed.connect(self.on_video_probed)
+        # 文件指纹，用于找回在程序外被移动的视频
+        self.fingerprints = FingerprintService()
+        self.fingerprints.fingerprinted.connect(self.on_video_fingerprinted)
+        self.load_library()
+        
+        # 文件夹扫描器
+        self.scanner = DirectoryScanner()
+        self.scanner.batch_found.connect(self.on_scan_batch)
+        self.scanner.finished.connect(self.on_scan_finished)
+        
+        # 重复视频查找，签名与缩略图缓存在一起
+        self.dedup = DuplicateFinder(ThumbnailService.instance().disk_cache)
+        self.dedup.progress.connect(
+            lambda done, total: self.statusBar().showMessage(f"正在查找重复视频... {done}/{total}"))
+        self.dedup.finished.connect(self.on_duplicates_found)
+        
         # 启动台词自动切换定时器
         self.quote_timer = QTimer(self)
         self.quote_timer.timeout.connect(self.update_quote)
@@ -577,6 +883,43 @@ class MainWindow(QMainWindow):
         button_layout = QHBoxLayout(button_container)
         button_layout.setSpacing(10)
         
+        # 搜索和排序
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("搜索文件名")
+        self.search_edit.setFixedWidth(180)
+        self.search_edit.setStyleSheet("""
+            QLineEdit {
+                border: 1px solid #E0E0E0;
+                border-radius: 4px;
+                padding: 6px 8px;
+                font-size: 14px;
+            }
+        """)
+        self.search_edit.textChanged.connect(self.apply_view)
+        button_layout.addWidget(self.search_edit)
+        
+        self.sort_combo = QComboBox()
+        for label, key in SORT_OPTIONS:
+            self.sort_combo.addItem(label, key)
+        self.sort_combo.setStyleSheet("""
+            QComboBox {
+                border: 1px solid #E0E0E0;
+                border-radius: 4px;
+                padding: 6px 8px;
+                font-size: 14px;
+            }
+        """)
+        self.sort_combo.currentIndexChanged.connect(self.apply_view)
+        button_layout.addWidget(self.sort_combo)
+        
+        self.playback_limit_combo = QComboBox()
+        for label, limits in PLAYBACK_LIMIT_OPTIONS:
+            self.playback_limit_combo.addItem(label, limits)
+        self.playback_limit_combo.setStyleSheet(self.sort_combo.styleSheet())
+        self.playback_limit_combo.currentIndexChanged.connect(
+            lambda: self.scheduler.set_limits(*self.playback_limit_combo.currentData()))
+        button_layout.addWidget(self.playback_limit_combo)
+        
         # 上传按钮
         upload_btn = QPushButton("上传")
         upload_btn.setStyleSheet("""
@@ -596,6 +939,18 @@ class MainWindow(QMainWindow):
         upload_btn.clicked.connect(self.add_videos)
         button_layout.addWidget(upload_btn)
         
+        # 导入文件夹按钮
+        self.import_folder_btn = QPushButton("导入文件夹")
+        self.import_folder_btn.setStyleSheet(upload_btn.styleSheet())
+        self.import_folder_btn.clicked.connect(self.import_folder)
+        button_layout.addWidget(self.import_folder_btn)
+        
+        # 查找重复按钮
+        self.dedup_btn = QPushButton("查找重复")
+        self.dedup_btn.setStyleSheet(upload_btn.styleSheet())
+        self.dedup_btn.clicked.connect(self.find_duplicates)
+        button_layout.addWidget(self.dedup_btn)
+        
         # 移动到按钮
         move_btn = QPushButton("移动到")
         move_btn.setStyleSheet("""
@@ -615,6 +970,12 @@ class MainWindow(QMainWindow):
         move_btn.clicked.connect(self.move_videos)
         button_layout.addWidget(move_btn)
         
+        # 拼接预览按钮
+        mosaic_btn = QPushButton("拼接预览")
+        mosaic_btn.setStyleSheet(move_btn.styleSheet())
+        mosaic_btn.clicked.connect(self.show_mosaic)
+        button_layout.addWidget(mosaic_btn)
+        
         # 全选按钮
         select_all_btn = QPushButton()
         select_all_btn.setIcon(QIcon.fromTheme("edit-select-all"))
@@ -640,9 +1001,9 @@ class MainWindow(QMainWindow):
         top_layout.addWidget(button_container)
         layout.addWidget(top_frame)
         
-        # 视频网格区域
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
+        # 视频网格区域（虚拟化，只为可见行创建卡片）
+        self.gallery = VideoGallery(self.create_video_card)
+        self.scroll_area = self.gallery
         self.scroll_area.setStyleSheet("""
             QScrollArea {
                 background-color: white;
@@ -652,14 +1013,7 @@ class MainWindow(QMainWindow):
                 background-color: white;
             }
         """)
-        
-        self.grid_widget = QWidget()
-        self.grid_widget.setObjectName("gridWidget")
-        self.grid_layout = QGridLayout(self.grid_widget)
-        self.grid_layout.setSpacing(20)
-        self.grid_layout.setContentsMargins(10, 10, 10, 10)
-        self.scroll_area.setWidget(self.grid_widget)
-        
+        self.scroll_area.hide()
         layout.addWidget(self.scroll_area)
         
         # 空状态提示
@@ -691,7 +1045,157 @@ class MainWindow(QMainWindow):
         upload_icon_btn.clicked.connect(self.add_videos)
         empty_layout.addWidget(upload_icon_btn, alignment=Qt.AlignmentFlag.AlignCenter)
         
-        self.grid_layout.addWidget(self.empty_state, 0, 0)
+        layout.addWidget(self.empty_state)
+        
+    def create_video_card(self) -> VideoPreviewWidget:
+        """画廊需要新卡片时调用"""
+        card = VideoPreviewWidget()
+        card.scheduler = self.scheduler
+        card.delete_requested.connect(self.delete_video)
+        card.playback_requested.connect(self.on_playback_requested)
+        card.display_name_changed.connect(
+            lambda record: self.library.update_display_name(record.path, record.display_name))
+        return card
+        
+    def on_playback_requested(self, record: VideoRecord):
+        """用户手动开始播放时，其余因离开视口而暂停的视频不再自动继续"""
+        for other in self.videos:
+            if other is not record:
+                other.auto_resume = False
+        for card in self.gallery.visible_cards():
+            if card.record is not record:
+                card.cancel_auto_resume()
+        
+    @staticmethod
+    def path_key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+        
+    def load_library(self):
+        """从媒体库索引恢复画廊，后台检查文件是否有变化"""
+        records = self.library.load()
+        self.videos.extend(records)
+        self.records_by_path = {self.path_key(record.path): record for record in records}
+        for record in records:
+            if record.partial_hash:
+                self.records_by_hash.setdefault(record.partial_hash, []).append(record)
+        self.apply_view()
+        self.update_empty_state()
+        self.prober.submit([(record.path, record.size, record.mtime_ns) for record in records])
+        self.fingerprints.submit(record.path for record in records if not record.partial_hash)
+        
+    def is_default_view(self) -> bool:
+        return (self.duplicate_groups is None and not self.search_edit.text().strip()
+                and self.sort_combo.currentData() == "default")
+        
+    def apply_view(self):
+        """按搜索条件和排序方式刷新画廊，只读取记录中的元数据"""
+        if self.duplicate_groups is not None:
+            # 重复分组依次排列，已删除的记录不再显示
+            self.gallery.set_records(record for group in self.duplicate_groups for record in group
+                                     if self.records_by_path.get(self.path_key(record.path)) is record)
+            return
+        records = list(self.videos)
+        text = self.search_edit.text().strip().lower()
+        if text:
+            records = [record for record in records if text in record.display_name.lower()]
+        sort_key = self.sort_combo.currentData()
+        if sort_key == "name":
+            records.sort(key=lambda record: record.display_name.lower())
+        elif sort_key == "duration":
+            records.sort(key=lambda record: record.duration_ms or 0, reverse=True)
+        elif sort_key == "resolution":
+            records.sort(key=lambda record: (record.width or 0) * (record.height or 0), reverse=True)
+        elif sort_key == "size":
+            records.sort(key=lambda record: record.size or 0, reverse=True)
+        elif sort_key == "mtime":
+            records.sort(key=lambda record: record.mtime_ns or 0, reverse=True)
+        self.gallery.set_records(records)
+        
+    def add_records(self, records: List[VideoRecord], at_front: bool = False) -> List[VideoRecord]:
+        """把新视频加入媒体库和画廊，已存在的路径会被忽略"""
+        new_records = []
+        for record in records:
+            key = self.path_key(record.path)
+            if key not in self.records_by_path:
+                self.records_by_path[key] = record
+                new_records.append(record)
+        if not new_records:
+            return []
+        if at_front:
+            self.videos.extendleft(reversed(new_records))
+        else:
+            self.videos.extend(new_records)
+        self.library.add(new_records, at_front)
+        if self.is_default_view():
+            self.gallery.insert_records(new_records, 0 if at_front else len(self.gallery.records))
+        else:
+            self.apply_view()
+        self.update_empty_state()
+        self.prober.submit([(record.path, None, None) for record in new_records])
+        self.relink_candidates.update(self.path_key(record.path) for record in new_records)
+        self.fingerprints.submit(record.path for record in new_records)
+        return new_records
+        
+    def on_video_probed(self, path: str, meta: dict):
+        """后台探测完成，保存元数据并刷新卡片"""
+        record = self.records_by_path.get(self.path_key(path))
+        if record is None:
+            return
+        for field, value in meta.items():
+            setattr(record, field, value)
+        self.library.update_metadata(record)
+        self.schedule_library_commit()
+        widget = self.gallery.card_for(record)
+        if widget:
+            widget.update_metadata_display()
+        
+    def on_video_fingerprinted(self, path: str, size: int, partial: str, _full: str):
+        """保存文件指纹；新导入的文件与媒体库中已丢失的视频相同时，视为该视频被移动"""
+        key = self.path_key(path)
+        record = self.records_by_path.get(key)
+        if record is None:
+            return
+        # 只有新导入的文件可以接替丢失的记录，媒体库中原有的记录只补全指纹
+        can_relink = key in self.relink_candidates
+        self.relink_candidates.discard(key)
+        for other in self.records_by_hash.get(partial, ()) if can_relink else ():
+            if (other is not record and self.records_by_path.get(self.path_key(other.path)) is other
+                    and not os.path.exists(other.path)):
+                # 保留原记录的显示名称和位置，去掉新加入的重复记录
+                self.delete_video(record)
+                self.relocate_record(other, path)
+                widget = self.gallery.card_for(other)
+                if widget:
+                    widget.update_video_path()
+                self.statusBar().showMessage(f"已找到移动后的文件：{other.display_name}", 5000)
+                return
+        record.partial_hash = partial
+        self.records_by_hash.setdefault(partial, []).append(record)
+        self.library.update_fingerprint(record.path, partial)
+        self.schedule_library_commit()
+        
+    def schedule_library_commit(self):
+        """延迟提交媒体库，期间到达的更新合并为一次提交"""
+        if not self.library_commit_timer.isActive():
+            self.library_commit_timer.start()
+        
+    def relocate_record(self, record: VideoRecord, new_path: str):
+        """记录对应的文件被移动后指向新路径，缓存随文件转移"""
+        old_path = record.path
+        self.records_by_path.pop(self.path_key(old_path), None)
+        record.path = new_path
+        self.records_by_path[self.path_key(new_path)] = record
+        self.library.update_path(old_path, record)
+        disk_cache = ThumbnailService.instance().disk_cache
+        if disk_cache:
+            disk_cache.rename_path(old_path, new_path)
+        KeyframeIndex.rename_cache(old_path, new_path)
+        
+    def update_empty_state(self):
+        """根据是否有视频切换空状态提示"""
+        has_videos = bool(self.videos)
+        self.empty_state.setVisible(not has_videos)
+        self.scroll_area.setVisible(has_videos)
         
     def add_videos(self):
         files, _ = QFileDialog.getOpenFileNames(
@@ -702,64 +1206,85 @@ class MainWindow(QMainWindow):
         )
         
         if files:
-            if len(files) + len(self.videos) > 50:
-                QMessageBox.warning(self, "警告", "视频数量不能超过50个！")
-                return
-                
-            # 隐藏空状态提示
-            self.empty_state.hide()
-            
             # 添加视频到列表开头
-            for file in reversed(files):  # 反转顺序添加，保证最后选择的文件显示在最前面
-                self.add_video_widget(file, insert_at_beginning=True)
-                
-    def add_video_widget(self, file_path, insert_at_beginning=False):
-        video_widget = VideoPreviewWidget(file_path)
-        
-        if insert_at_beginning:
-            # 将所有现有视频向后移动
-            self.videos.insert(0, {
-                "widget": video_widget,
-                "path": file_path
-            })
-        else:
-            # 添加到末尾
-            self.videos.append({
-                "widget": video_widget,
-                "path": file_path
-            })
-            
-        # 重新排列所有视频
-        self.rearrange_videos()
-            
-    def rearrange_videos(self):
-        # 临时存储所有视频部件
-        widgets = []
-        for video in self.videos:
-            widget = video["widget"]
-            # 从布局中移除但不删除部件
-            self.grid_layout.removeWidget(widget)
-            widgets.append(widget)
+            self.add_records([VideoRecord(os.path.abspath(file)) for file in files], at_front=True)
             
-        # 重新添加到网格布局
-        for i, widget in enumerate(widgets):
-            row = i // 3
-            col = i % 3
-            self.grid_layout.addWidget(widget, row, col)
-            
-    def delete_video(self, widget):
-        # 从视频列表中移除
-        for video in self.videos[:]:
-            if video["widget"] == widget:
-                self.videos.remove(video)
-                break
-                
-        # 重新排列剩余视频
-        self.rearrange_videos()
+    def import_folder(self):
+        """递归导入文件夹中的视频，扫描中再次点击则取消"""
+        if self.scanner.is_running():
+            self.scanner.cancel()
+            return
+        folder = QFileDialog.getExistingDirectory(self, "选择要导入的文件夹")
+        if not folder:
+            return
+        self._scan_found = 0
+        self.import_folder_btn.setText("取消导入")
+        self.statusBar().showMessage("正在扫描...")
+        self.scanner.start(folder)
+        
+    def on_scan_batch(self, paths: List[str]):
+        """扫描到一批视频，追加到画廊末尾"""
+        records = self.add_records([VideoRecord(path) for path in paths])
+        self._scan_found += len(records)
+        self.statusBar().showMessage(f"正在扫描... 已添加 {self._scan_found} 个视频")
+        
+    def on_scan_finished(self, total: int, cancelled: bool):
+        self.import_folder_btn.setText("导入文件夹")
+        state = "已取消" if cancelled else "完成"
+        self.statusBar().showMessage(f"扫描{state}，新增 {self._scan_found} 个视频", 5000)
+        
+    def find_duplicates(self):
+        """查找近似重复的视频；查找中再次点击取消，显示结果时再次点击恢复全部视频"""
+        if self.duplicate_groups is not None:
+            self.duplicate_groups = None
+            self.dedup_btn.setText("查找重复")
+            self.apply_view()
+            return
+        if self.dedup.is_running():
+            self.dedup.cancel()
+            return
+        if len(self.videos) < 2:
+            self.show_info("至少需要两个视频才能查找重复")
+            return
+        self.dedup_btn.setText("取消查找")
+        self.statusBar().showMessage("正在查找重复视频...")
+        self.dedup.start([record.path for record in self.videos])
+        
+    def on_duplicates_found(self, groups: List[List[str]], cancelled: bool):
+        """显示重复分组，每组保留分辨率和文件最大的一个，其余自动选中"""
+        self.dedup_btn.setText("查找重复")
+        if cancelled:
+            self.statusBar().showMessage("已取消查找重复视频", 5000)
+            return
+        record_groups = []
+        for paths in groups:
+            group = [self.records_by_path[key] for key in map(self.path_key, paths) if key in self.records_by_path]
+            if len(group) > 1:
+                group.sort(key=lambda record: ((record.width or 0) * (record.height or 0), record.size or 0),
+                           reverse=True)
+                record_groups.append(group)
+        if not record_groups:
+            self.statusBar().showMessage("未发现重复视频", 5000)
+            return
+        for group in record_groups:
+            group[0].selected = False
+            for record in group[1:]:
+                record.selected = True
+        self.duplicate_groups = record_groups
+        self.dedup_btn.setText("显示全部")
+        self.apply_view()
+        extra = sum(len(group) - 1 for group in record_groups)
+        self.statusBar().showMessage(f"发现 {len(record_groups)} 组重复视频，已选中 {extra} 个多余的副本")
+        
+    def delete_video(self, record: VideoRecord):
+        # 先回收卡片，再从视频列表和媒体库中移除
+        self.gallery.remove_record(record)
+        self.videos.remove(record)
+        self.records_by_path.pop(self.path_key(record.path), None)
+        self.library.remove(record.path)
         
         # 如果没有视频了，显示空状态
-        if not self.videos:
-            self.empty_state.show()
+        self.update_empty_state()
             
     def toggle_select_all(self):
         """切换全选状态"""
@@ -768,63 +1293,61 @@ class MainWindow(QMainWindow):
         self.select_all_btn.style().unpolish(self.select_all_btn)
         self.select_all_btn.style().polish(self.select_all_btn)
         
-        # 更新所有视频卡片的选中状态
-        for video in self.videos:
-            widget = video["widget"]
-            widget.selected = self.is_all_selected
-            
-            # 更新卡片状态
-            widget.setProperty("selected", self.is_all_selected)
-            widget.style().unpolish(widget)
-            widget.style().polish(widget)
+        # 更新画廊中显示的视频记录的选中状态
+        for record in self.gallery.records:
+            record.selected = self.is_all_selected
             
-            # 更新文件名状态
-            widget.name_edit.setProperty("selected", self.is_all_selected)
-            widget.name_edit.style().unpolish(widget.name_edit)
-            widget.name_edit.style().polish(widget.name_edit)
-            
-            # 更新标题栏状态
-            title_container = widget.findChild(QWidget, "titleContainer")
-            if title_container:
-                title_container.setProperty("selected", self.is_all_selected)
-                title_container.style().unpolish(title_container)
-                title_container.style().polish(title_container)
-            
-            # 更新选择按钮状态
-            widget.update_select_button()
+        # 只需刷新已创建的卡片
+        for widget in self.gallery.visible_cards():
+            widget.apply_selected_style()
             
+    def show_info(self, text: str):
+        """显示提示信息"""
+        # 使用QMessageBox创建更现代的提示框
+        msg = QMessageBox(self)
+        msg.setIcon(QMessageBox.Icon.Information)
+        msg.setWindowTitle("提示")
+        msg.setText(text)
+        msg.setStandardButtons(QMessageBox.StandardButton.Ok)
+        msg.setStyleSheet("""
+            QMessageBox {
+                background-color: white;
+            }
+            QMessageBox QLabel {
+                color: #333333;
+                font-size: 14px;
+                padding: 10px;
+            }
+            QPushButton {
+                background-color: #42B883;
+                color: white;
+                border: none;
+                border-radius: 4px;
+                padding: 8px 24px;
+                font-size: 14px;
+            }
+            QPushButton:hover {
+                background-color: #3AA876;
+            }
+        """)
+        msg.exec()
+        
+    def show_mosaic(self):
+        """把选中的视频拼接在一个窗口中同时预览"""
+        selected_records = [record for record in self.videos if record.selected]
+        if not selected_records:
+            self.show_info("请选择要预览的视频")
+            return
+        if len(selected_records) > MAX_CLIPS:
+            self.show_info(f"拼接预览最多显示 {MAX_CLIPS} 个视频，将只显示前 {MAX_CLIPS} 个")
+        wall = MosaicWall([record.path for record in selected_records], parent=self)
+        wall.show()
+        
     def move_videos(self):
-        """复制选中的视频到新位置"""
-        selected_widgets = [v for v in self.videos if v["widget"].selected]
-        if not selected_widgets:
-            # 使用QMessageBox创建更现代的提示框
-            msg = QMessageBox(self)
-            msg.setIcon(QMessageBox.Icon.Information)
-            msg.setWindowTitle("提示")
-            msg.setText("请选择要移动的视频")
-            msg.setStandardButtons(QMessageBox.StandardButton.Ok)
-            msg.setStyleSheet("""
-                QMessageBox {
-                    background-color: white;
-                }
-                QMessageBox QLabel {
-                    color: #333333;
-                    font-size: 14px;
-                    padding: 10px;
-                }
-                QPushButton {
-                    background-color: #42B883;
-                    color: white;
-                    border: none;
-                    border-radius: 4px;
-                    padding: 8px 24px;
-                    font-size: 14px;
-                }
-                QPushButton:hover {
-                    background-color: #3AA876;
-                }
-            """)
-            msg.exec()
+        """移动或复制选中的视频到新位置"""
+        selected_records = [record for record in self.videos if record.selected]
+        if not selected_records:
+            self.show_info("请选择要移动的视频")
             return
             
         # 选择目标文件夹
@@ -832,75 +1355,113 @@ class MainWindow(QMainWindow):
         if not target_dir:
             return
             
+        # 选择移动还是复制
+        mode_box = QMessageBox(self)
+        mode_box.setIcon(QMessageBox.Icon.Question)
+        mode_box.setWindowTitle("移动到")
+        mode_box.setText(f"将选中的 {len(selected_records)} 个视频移动还是复制到：{target_dir}？")
+        move_button = mode_box.addButton("移动", QMessageBox.ButtonRole.AcceptRole)
+        copy_button = mode_box.addButton("复制", QMessageBox.ButtonRole.AcceptRole)
+        mode_box.addButton("取消", QMessageBox.ButtonRole.RejectRole)
+        mode_box.setDefaultButton(move_button)
+        mode_box.exec()
+        if mode_box.clickedButton() not in (move_button, copy_button):
+            return
+        move = mode_box.clickedButton() is move_button
+        action = "移动" if move else "复制"
+            
+        new_names = []
+        for record in selected_records:
+            # 使用显示名称作为新的文件名
+            new_name = record.display_name
+            if not os.path.splitext(new_name)[1]:  # 如果没有扩展名，使用原文件扩展名
+                _, ext = os.path.splitext(record.path)
+                new_name = new_name + ext
+            new_names.append(new_name)
+            
+        # 一次列出目标目录，统一处理文件名冲突（包括同一批次内的重名）
         try:
-            for video in selected_widgets:
-                widget = video["widget"]
-                info = widget.get_current_info()
-                
-                # 使用显示名称作为新的文件名
-                new_name = info['display_name']
-                if not os.path.splitext(new_name)[1]:  # 如果没有扩展名，使用原文件扩展名
-                    _, ext = os.path.splitext(info['original_path'])
-                    new_name = new_name + ext
-                    
-                new_path = os.path.join(target_dir, new_name)
-                
-                # 处理文件名冲突
-                base, ext = os.path.splitext(new_path)
-                counter = 1
-                while os.path.exists(new_path):
-                    new_path = f"{base}_{counter}{ext}"
-                    counter += 1
-                
-                # 复制文件
-                import shutil
-                shutil.copy2(info['original_path'], new_path)
-                
-                # 更新UI状态
-                widget.selected = False
-                widget.setProperty("selected", False)
-                widget.style().unpolish(widget)
-                widget.style().polish(widget)
+            new_paths = plan_destinations(new_names, target_dir)
+        except OSError as e:
+            QMessageBox.critical(self, "错误", f"无法读取目标文件夹：{str(e)}")
+            return
+        jobs = [(record.path, new_path) for record, new_path in zip(selected_records, new_paths)]
+        # 因重名改用其他文件名时，原名的文件内容若与源文件相同则跳过
+        existing = [os.path.join(target_dir, name) for name in new_names]
             
-            QMessageBox.information(self, "成功", f"已将选中的视频复制到：{target_dir}")
+        # 移动前停止这些视频的播放，释放文件占用
+        if move:
+            for record in selected_records:
+                widget = self.gallery.card_for(record)
+                if widget:
+                    widget.player.stop()
+                    widget.on_player_revoked()
+                    
+        # 在后台处理，对话框显示进度
+        self.copy_engine = CopyEngine()
+        failures = []
+        skipped = []
+        self.copy_engine.file_skipped.connect(lambda index, dst: skipped.append(index))
+        self.copy_engine.file_finished.connect(
+            lambda index, dst: self.on_video_copied(selected_records[index], dst, move))
+        self.copy_engine.file_failed.connect(
+            lambda index, error: failures.append(f"{selected_records[index].display_name}: {error}"))
+        dialog = CopyProgressDialog(self.copy_engine, [r.display_name for r in selected_records],
+                                    f"正在{action}", self)
+        try:
+            self.copy_engine.start(jobs, move=move, existing=existing)
+        except OSError as e:
+            QMessageBox.critical(self, "错误", f"{action}文件时出错：{str(e)}")
+            return
+        dialog.exec()
+        
+        if failures:
+            QMessageBox.critical(self, "错误", f"{action}文件时出错：\n" + "\n".join(failures))
+        elif dialog.cancelled:
+            QMessageBox.information(self, "提示", f"{action}已取消，再次{action}到同一位置时会从中断处继续")
+        else:
+            note = f"\n其中 {len(skipped)} 个在目标文件夹中已有相同的文件，未重复{action}" if skipped else ""
+            QMessageBox.information(self, "成功", f"已将选中的视频{action}到：{target_dir}{note}")
             
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"复制文件时出错：{str(e)}")
+    def on_video_copied(self, record: VideoRecord, dst: str, moved: bool):
+        """单个视频处理完成后取消选中，移动的视频指向新位置"""
+        record.selected = False
+        if moved:
+            current = self.records_by_path.get(self.path_key(dst))
+            if current is not None and current is not record:
+                # 目标路径已被另一条记录占用（已丢失的旧记录，或已存在的相同文件），
+                # 保留刚移动的这条，去掉旧记录
+                self.delete_video(current)
+            record.display_name = os.path.basename(dst)
+            self.relocate_record(record, dst)
+        widget = self.gallery.card_for(record)
+        if widget:
+            if moved:
+                widget.update_video_path()
+            widget.apply_selected_style()
             
+    def changeEvent(self, event):
+        """最小化时暂停所有正在播放的卡片，恢复窗口后继续"""
+        if event.type() == QEvent.Type.WindowStateChange:
+            self.gallery.set_suspended(self.isMinimized())
+        super().changeEvent(event)
+        
     def update_quote(self):
         """更新电影台词"""
         self.current_quote_index = (self.current_quote_index + 1) % len(self.movie_quotes)
         self.quote_label.setText(self.movie_quotes[self.current_quote_index])
 
-    def update_grid_layout(self):
-        """更新网格布局"""
-        # 移除所有部件
-        while self.grid_layout.count():
-            item = self.grid_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-                
-        # 重新添加视频卡片
-        row = 0
-        col = 0
-        max_cols = 3
-        
-        for video in self.videos:
-            if video["widget"].parent():  # 检查部件是否仍然有效
-                self.grid_layout.addWidget(video["widget"], row, col)
-                col += 1
-                if col >= max_cols:
-                    col = 0
-                    row += 1
-                    
-        # 如果没有视频，显示空状态
-        if not self.videos:
-            self.empty_state.show()
-        else:
-            self.empty_state.hide()
-
 if __name__ == "__main__":
+    # 元数据探测使用工作进程，打包后需要
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
+    # 先收回所有播放器（被收回的卡片会请求缩略图），再关闭缩略图服务
+    app.aboutToQuit.connect(VLCInstanceManager.instance().shutdown)
+    app.aboutToQuit.connect(ThumbnailService.instance().shutdown)
     window = MainWindow()
+    app.aboutToQuit.connect(window.fingerprints.shutdown)
+    # 取消后排队中的签名任务立即返回，退出时不必等待整批解码
+    app.aboutToQuit.connect(window.dedup.cancel)
+    app.aboutToQuit.connect(window.library.close)
     window.show()
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,137 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from typing import List, Optional, Tuple
+
+import cv2
+from PyQt6.QtCore import QObject, pyqtSignal
+
+
+def probe_metadata(video_path: str) -> Optional[dict]:
+    """读取视频的时长、分辨率、编码和帧率，无法打开时返回None
+
+    只读取容器属性不解码画面，在工作进程中执行。
+    """
+    try:
+        st = os.stat(video_path)
+    except OSError:
+        return None
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC) or 0)
+        return {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "duration_ms": int(frame_count * 1000 / fps) if fps > 0 else 0,
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0),
+            "codec": "".join(chr((fourcc >> 8 * i) & 0xFF) for i in range(4)).strip("\x00 "),
+            "fps": round(fps, 3),
+        }
+    finally:
+        cap.release()
+
+
+class MetadataProber(QObject):
+    """批量探测视频元数据的进程池服务
+
+    提交 (路径, 已知大小, 已知修改时间)，已知信息与文件一致的跳过，其余分发到
+    工作进程并行探测。每个文件有独立的超时，损坏的文件卡住时终止并重建进程池，
+    其余任务重新排队，不会拖住整批探测。
+    """
+
+    probed = pyqtSignal(str, dict)  # 路径, 元数据
+    failed = pyqtSignal(str, str)  # 路径, 原因
+    finished = pyqtSignal()
+
+    POLL_INTERVAL = 0.02  # 秒
+
+    def __init__(self, max_workers: int = 0, timeout: float = 15.0):
+        super().__init__()
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.timeout = timeout
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, items: List[Tuple[str, Optional[int], Optional[int]]]):
+        """提交待探测的文件"""
+        with self._lock:
+            self._queue.extend(items)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _next_job(self) -> Optional[str]:
+        """取出下一个需要探测的文件，跳过未变化的文件"""
+        while True:
+            with self._lock:
+                if not self._queue:
+                    return None
+                path, known_size, known_mtime = self._queue.popleft()
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if st.st_size != known_size or st.st_mtime_ns != known_mtime:
+                return path
+
+    def _run(self):
+        # 使用spawn避免在带有Qt线程的进程中fork
+        context = multiprocessing.get_context("spawn")
+        pool = None
+        in_flight = {}  # 异步结果 -> (路径, 截止时间)
+        try:
+            while True:
+                while len(in_flight) < self.max_workers:
+                    path = self._next_job()
+                    if path is None:
+                        break
+                    if pool is None:
+                        pool = context.Pool(self.max_workers)
+                    in_flight[pool.apply_async(probe_metadata, (path,))] = (path, time.monotonic() + self.timeout)
+                if not in_flight:
+                    with self._lock:
+                        if not self._queue:
+                            self._thread = None
+                            break
+                    continue
+
+                timed_out = False
+                now = time.monotonic()
+                for result, (path, deadline) in list(in_flight.items()):
+                    if result.ready():
+                        del in_flight[result]
+                        try:
+                            meta = result.get()
+                        except Exception as e:
+                            self.failed.emit(path, str(e))
+                            continue
+                        if meta is None:
+                            self.failed.emit(path, "无法打开视频")
+                        else:
+                            self.probed.emit(path, meta)
+                    elif now > deadline:
+                        del in_flight[result]
+                        self.failed.emit(path, "探测超时")
+                        timed_out = True
+
+                if timed_out:
+                    # 卡住的工作进程无法单独回收，重建进程池并把其余任务放回队首
+                    pool.terminate()
+                    pool = None
+                    with self._lock:
+                        self._queue.extendleft((path, None, None) for path, _ in in_flight.values())
+                    in_flight.clear()
+                elif in_flight:
+                    time.sleep(self.POLL_INTERVAL)
+        finally:
+            if pool is not None:
+                pool.close()
+        self.finished.emit()
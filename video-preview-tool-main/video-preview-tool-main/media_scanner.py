@@ -0,0 +1,172 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from thumbnail_cache import default_cache_dir
+
+VIDEO_EXTENSIONS = {
+    ".mp4", ".m4v", ".mov", ".avi", ".mkv", ".webm", ".wmv", ".asf", ".flv",
+    ".ts", ".mts", ".m2ts", ".mpg", ".mpeg", ".vob", ".3gp", ".ogv",
+}
+# 明显不是视频的扩展名，不读取文件内容
+SKIP_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp", ".heic", ".tif", ".tiff",
+    ".txt", ".srt", ".ass", ".vtt", ".nfo", ".xml", ".json", ".ini", ".log",
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".zip", ".rar", ".7z",
+    ".mp3", ".wav", ".flac", ".aac", ".m4a", ".exe", ".dll", ".lnk", ".part",
+    ".py", ".pyc",
+}
+ASF_GUID = bytes.fromhex("3026b2758e66cf11a6d900aa0062ce6c")
+
+
+def sniff_video_format(path: str) -> Optional[str]:
+    """根据文件头识别视频容器格式，无法识别时返回None"""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(200)
+    except OSError:
+        return None
+    if len(header) < 16:
+        return None
+    box = header[4:8]
+    if box == b"ftyp":
+        return "mov" if header[8:10] == b"qt" else "mp4"
+    if box in (b"moov", b"mdat", b"wide", b"free"):
+        return "mov"
+    if header[:4] == b"\x1a\x45\xdf\xa3":
+        return "mkv"
+    if header[:4] == b"RIFF" and header[8:12] == b"AVI ":
+        return "avi"
+    if header[:3] == b"FLV":
+        return "flv"
+    if header[:16] == ASF_GUID:
+        return "wmv"
+    if header[:4] == b"\x00\x00\x01\xba":
+        return "mpg"
+    if header[0] == 0x47 and len(header) > 188 and header[188] == 0x47:
+        return "ts"
+    if len(header) > 196 and header[4] == 0x47 and header[196] == 0x47:
+        return "m2ts"
+    if header[:4] == b"OggS" and b"theora" in header:
+        return "ogv"
+    return None
+
+
+def is_video_file(path: str) -> bool:
+    """已知视频扩展名直接接受，其他未知扩展名读取文件头判断"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in VIDEO_EXTENSIONS:
+        return True
+    if ext in SKIP_EXTENSIONS:
+        return False
+    return sniff_video_format(path) is not None
+
+
+class DirectoryScanner(QObject):
+    """后台递归扫描文件夹中的视频
+
+    用 os.scandir 逐层遍历，找到的视频分批通过 batch_found 发出。每个目录的
+    修改时间和扫描结果保存在缓存中，再次扫描时目录未变化则不再列目录和识别格式。
+    """
+
+    batch_found = pyqtSignal(list)  # 一批视频路径
+    finished = pyqtSignal(int, bool)  # 视频总数, 是否被取消
+
+    BATCH_SIZE = 200
+    BATCH_INTERVAL = 0.25  # 秒
+
+    def __init__(self, state_path: Optional[str] = None):
+        super().__init__()
+        self.state_path = os.path.abspath(state_path or os.path.join(default_cache_dir(), "scan_state.json"))
+        self._cancelled = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, root: str):
+        """开始扫描root"""
+        self._cancelled.clear()
+        self._thread = threading.Thread(target=self._run, args=(os.path.abspath(root),), daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _load_state(self) -> Dict[str, list]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state: Dict[str, list]):
+        try:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            tmp = self.state_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp, self.state_path)
+        except OSError as e:
+            print(f"Error saving scan state: {str(e)}")
+
+    def _list_directory(self, directory: str):
+        """列出目录，返回 (视频文件, 子目录)"""
+        files: List[str] = []
+        subdirs: List[str] = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith("."):
+                            subdirs.append(entry.name)
+                    elif entry.is_file() and is_video_file(entry.path):
+                        files.append(entry.name)
+                except OSError:
+                    continue
+        files.sort()
+        subdirs.sort()
+        return files, subdirs
+
+    def _run(self, root: str):
+        state = self._load_state()
+        batch: List[str] = []
+        found = 0
+        last_emit = time.monotonic()
+        stack = [root]
+        while stack and not self._cancelled.is_set():
+            directory = stack.pop()
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue
+            cached = state.get(directory)
+            if cached and cached[0] == mtime_ns:
+                # 目录未变化，沿用上次的结果
+                files, subdirs = cached[1], cached[2]
+            else:
+                try:
+                    files, subdirs = self._list_directory(directory)
+                except OSError:
+                    continue
+                state[directory] = [mtime_ns, files, subdirs]
+
+            batch.extend(os.path.join(directory, name) for name in files)
+            stack.extend(os.path.join(directory, name) for name in reversed(subdirs))
+
+            now = time.monotonic()
+            if len(batch) >= self.BATCH_SIZE or (batch and now - last_emit >= self.BATCH_INTERVAL):
+                found += len(batch)
+                self.batch_found.emit(batch)
+                batch = []
+                last_emit = now
+
+        if batch:
+            found += len(batch)
+            self.batch_found.emit(batch)
+        self._save_state(state)
+        self.finished.emit(found, self._cancelled.is_set())
@@ -0,0 +1,166 @@
+import math
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PyQt6.QtCore import QRect, Qt, QTimer
+from PyQt6.QtGui import QPainter
+from PyQt6.QtWidgets import QWidget
+
+from frame_presenter import LetterboxBuffer, fit_rect, wrap_bgr
+from thumbnail_service import open_capture
+
+MAX_CLIPS = 16  # 最多4×4
+MAX_GRAB_AHEAD = 30  # 落后超过该帧数时直接定位，不再逐帧grab
+
+
+class _MosaicClip:
+    """墙上的一个片段：独立的解码器和预分配的小图缓冲区（只在所属工作线程中访问）"""
+
+    def __init__(self, video_path: str, tile: Tuple[int, int, int, int]):
+        self.video_path = video_path
+        self.tile = tile  # 在画布中的 (x, y, 宽, 高)
+        self.cap: Optional[cv2.VideoCapture] = None
+        self.buffer = LetterboxBuffer((tile[2], tile[3]))
+        self.frame: Optional[np.ndarray] = None  # 复用的解码缓冲区
+        self.fps = 25.0
+        self.position = 0.0  # 下一次应显示的帧号（可为小数）
+        self.decoded = 0  # VideoCapture下一次读取的帧号
+
+    def open(self):
+        # 多个片段同时连续解码，优先硬件解码
+        self.cap = open_capture(self.video_path, hw_accel=True)
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps and fps > 0 else 25.0
+
+    def next_frame(self, step: float) -> Optional[np.ndarray]:
+        """前进step帧，跳过的帧只grab不转换，返回缩放好的小图
+
+        落后较多时（例如窗口被拖动期间）直接定位到目标帧，不再解码中间的每一帧。
+        """
+        self.position += step
+        target = int(self.position)
+        if target - self.decoded > MAX_GRAB_AHEAD:
+            if not self.cap.set(cv2.CAP_PROP_POS_FRAMES, target):
+                return self._rewind()
+            self.decoded = target
+        while self.decoded < target:
+            if not self.cap.grab():
+                return self._rewind()
+            self.decoded += 1
+        ret, self.frame = self.cap.read(self.frame)
+        if not ret:
+            return self._rewind()
+        self.decoded += 1
+        return self.buffer.present(self.frame)
+
+    def _rewind(self) -> None:
+        """播放到结尾后从头循环"""
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self.position = 0.0
+        self.decoded = 0
+        return None
+
+    def close(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class MosaicWall(QWidget):
+    """多片段拼接预览墙
+
+    后台工作线程各自负责几个片段，按上限帧率解码低分辨率画面并写入同一块NumPy
+    画布，窗口以同样的帧率把整块画布绘制一次。所有片段共用一个控件，不创建
+    libvlc播放器或原生窗口。
+    """
+
+    def __init__(self, video_paths: List[str], tile_size: Tuple[int, int] = (320, 180),
+                 max_fps: float = 12.0, max_workers: int = 4, parent=None):
+        super().__init__(parent, Qt.WindowType.Window)
+        self.setWindowTitle("拼接预览")
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.setStyleSheet("background: black;")
+        video_paths = video_paths[:MAX_CLIPS]
+        self.columns = max(1, math.ceil(math.sqrt(len(video_paths))))
+        self.rows = max(1, math.ceil(len(video_paths) / self.columns))
+        tile_w, tile_h = tile_size
+        self.canvas = np.zeros((self.rows * tile_h, self.columns * tile_w, 3), dtype=np.uint8)
+        self.canvas_lock = threading.Lock()
+        self.max_fps = max_fps
+        self.clips = [
+            _MosaicClip(path, ((i % self.columns) * tile_w, (i // self.columns) * tile_h, tile_w, tile_h))
+            for i, path in enumerate(video_paths)
+        ]
+        self._running = threading.Event()
+        self._dirty = False
+        self._threads = [
+            threading.Thread(target=self._run, args=(self.clips[i::max_workers],), daemon=True)
+            for i in range(min(max_workers, len(self.clips)))
+        ]
+
+        # 重绘也限制在同样的帧率，画布没有变化时不绘制
+        self.timer = QTimer(self)
+        self.timer.setInterval(max(1, int(1000 / max_fps)))
+        self.timer.timeout.connect(self._refresh)
+        self.resize(min(1280, self.canvas.shape[1]), min(720, self.canvas.shape[0]))
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._running.is_set():
+            self._running.set()
+            for thread in self._threads:
+                thread.start()
+            self.timer.start()
+
+    def closeEvent(self, event):
+        self._running.clear()
+        self.timer.stop()
+        for thread in self._threads:
+            if thread.is_alive():
+                thread.join()
+        super().closeEvent(event)
+
+    def _run(self, clips: List[_MosaicClip]):
+        """工作线程：按上限帧率轮流推进负责的片段"""
+        for clip in clips:
+            clip.open()
+        interval = 1.0 / self.max_fps
+        last = time.monotonic()
+        try:
+            while self._running.is_set():
+                now = time.monotonic()
+                elapsed = now - last
+                last = now
+                for clip in clips:
+                    # 按实际经过的时间推进，解码跟不上时跳帧而不是变慢
+                    tile = clip.next_frame(elapsed * clip.fps)
+                    if tile is None:
+                        continue
+                    x, y, w, h = clip.tile
+                    with self.canvas_lock:
+                        self.canvas[y:y+h, x:x+w] = tile
+                        self._dirty = True
+                remaining = interval - (time.monotonic() - now)
+                if remaining > 0:
+                    time.sleep(remaining)
+        finally:
+            for clip in clips:
+                clip.close()
+
+    def _refresh(self):
+        if self._dirty:
+            self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        canvas_h, canvas_w = self.canvas.shape[:2]
+        x, y, w, h = fit_rect((canvas_w, canvas_h), (self.width(), self.height()))
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        with self.canvas_lock:
+            # 画布包装为QImage不复制，持锁期间工作线程不会改写
+            painter.drawImage(QRect(x, y, w, h), wrap_bgr(self.canvas))
+            self._dirty = False
+        painter.end()
@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict
+
+from PyQt6.QtCore import QObject, QTimer
+
+
+class PlaybackTicker(QObject):
+    """所有正在播放的卡片共享的进度刷新定时器
+
+    只有存在正在播放的卡片时定时器才运行，每次触发在同一轮中依次刷新所有订阅者。
+    """
+
+    _shared = None
+
+    def __init__(self, interval_ms: int = 250):
+        super().__init__()
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self._tick)
+        self._subscribers: Dict[object, Callable[[], None]] = {}
+
+    @classmethod
+    def instance(cls) -> "PlaybackTicker":
+        """获取全局播放进度定时器"""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def set_refresh_rate(self, hz: float):
+        """设置进度刷新频率（每秒次数）"""
+        self.timer.setInterval(max(1, int(1000 / hz)))
+
+    def subscribe(self, owner, callback: Callable[[], None]):
+        """开始为owner定期调用callback"""
+        self._subscribers[owner] = callback
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def unsubscribe(self, owner):
+        """停止刷新owner，没有订阅者时定时器停止"""
+        self._subscribers.pop(owner, None)
+        if not self._subscribers:
+            self.timer.stop()
+
+    def _tick(self):
+        for callback in list(self._subscribers.values()):
+            callback()
+
+
+class PlaybackScheduler:
+    """限制同时解码播放的卡片数量
+
+    最近开始播放的 max_active 个卡片正常播放；其余按最近使用顺序，最多
+    max_background 个静音在后台继续播放，更早的直接暂停。卡片需实现
+    pause_playback() 和 set_background(background)，并在开始播放、暂停或
+    停止时调用 started/stopped。仅限GUI线程使用。
+    """
+
+    def __init__(self, max_active: int = 1, max_background: int = 0):
+        self.max_active = max(1, max_active)
+        self.max_background = max(0, max_background)
+        # 正在播放的卡片 -> 是否在后台，按开始播放的先后排序（最前面的最久未使用）
+        self._playing: "OrderedDict[object, bool]" = OrderedDict()
+
+    def set_limits(self, max_active: int, max_background: int = 0):
+        """修改并发上限，立即对正在播放的卡片生效"""
+        self.max_active = max(1, max_active)
+        self.max_background = max(0, max_background)
+        self._enforce()
+
+    def started(self, owner):
+        """owner开始或恢复播放"""
+        self._playing[owner] = self._playing.get(owner, False)
+        self._playing.move_to_end(owner)
+        self._enforce()
+
+    def stopped(self, owner):
+        """owner已暂停或停止，空出的名额交给最近的后台卡片"""
+        was_background = self._playing.pop(owner, None)
+        if was_background is None:
+            return
+        if was_background:
+            owner.set_background(False)
+        self._enforce()
+
+    def active_count(self) -> int:
+        return len(self._playing)
+
+    def _enforce(self):
+        owners = list(self._playing)
+        foreground = set(owners[-self.max_active:])
+        background = set(owners[-self.max_active - self.max_background:-self.max_active]
+                         if self.max_background else [])
+        for owner in owners:
+            if owner in foreground or owner in background:
+                is_background = owner in background
+                if self._playing[owner] != is_background:
+                    self._playing[owner] = is_background
+                    owner.set_background(is_background)
+            else:
+                if self._playing.pop(owner):
+                    owner.set_background(False)
+                owner.pause_playback()
+
+
+class PlaybackClock:
+    """播放时钟（线程安全）
+
+    把连续递增的帧序号映射到应显示的时刻。定位或变速时以当前时刻为新的起点，
+    各个流水线阶段据此判断帧是否已经迟到。
+    """
+
+    def __init__(self, fps: float):
+        self.fps = fps if fps and fps > 0 else 25.0
+        self.speed = 1.0
+        self._lock = threading.Lock()
+        self._origin_seq = 0.0
+        self._origin_time = time.monotonic()
+
+    @property
+    def frame_interval(self) -> float:
+        """当前速度下相邻两帧的间隔（秒）"""
+        return 1.0 / (self.fps * self.speed)
+
+    def start(self, seq: int):
+        """从此刻开始显示序号为seq的帧"""
+        with self._lock:
+            self._origin_seq = seq
+            self._origin_time = time.monotonic()
+
+    def set_speed(self, speed: float):
+        """改变播放速度，当前进度保持不变"""
+        with self._lock:
+            now = time.monotonic()
+            self._origin_seq += (now - self._origin_time) * self.fps * self.speed
+            self._origin_time = now
+            self.speed = speed
+
+    def due(self, seq: int) -> float:
+        """序号为seq的帧应显示的时刻（time.monotonic）"""
+        with self._lock:
+            return self._origin_time + (seq - self._origin_seq) / (self.fps * self.speed)
+
+    def lateness(self, seq: int) -> float:
+        """序号为seq的帧已迟到的秒数，尚未到时为负数"""
+        return time.monotonic() - self.due(seq)
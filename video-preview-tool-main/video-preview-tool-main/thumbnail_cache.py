@@ -0,0 +1,245 @@
+import hashlib
+import os
+import platform
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def default_cache_dir() -> str:
+    """应用缓存目录"""
+    if platform.system() == "Windows":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    elif platform.system() == "Darwin":  # macOS
+        base = os.path.expanduser("~/Library/Caches")
+    else:  # Linux
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "video-preview-tool")
+
+
+def default_data_dir() -> str:
+    """应用数据目录（保存媒体库等不可重建的数据）"""
+    if platform.system() == "Windows":
+        base = os.environ.get("APPDATA") or os.path.expanduser("~")
+    elif platform.system() == "Darwin":  # macOS
+        base = os.path.expanduser("~/Library/Application Support")
+    else:  # Linux
+        base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(base, "video-preview-tool")
+
+
+class ThumbnailDiskCache:
+    """持久化缩略图缓存
+
+    图片以JPEG保存在缓存目录中，SQLite索引记录来源文件的绝对路径、大小、
+    修改时间和目标分辨率。文件变化后旧条目自然失效，总大小超过预算时
+    按最近访问时间淘汰。
+    """
+
+    FLUSH_EVERY = 64  # 累计多少次命中后写回访问时间
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir or os.path.join(default_cache_dir(), "thumbnails")
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._touched = {}
+        self.db = sqlite3.connect(os.path.join(self.cache_dir, "index.sqlite"), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                width INTEGER NOT NULL,
+                height INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_path ON entries (path, kind)")
+        # 与文件内容绑定的少量数据（例如选中的封面帧），文件变化后失效
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS meta (
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (path, name)
+            )
+        """)
+        self.db.commit()
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()[0]
+
+    @staticmethod
+    def file_identity(video_path: str) -> Optional[Tuple[str, int, int]]:
+        """返回 (绝对路径, 文件大小, 修改时间)，文件不存在时返回None"""
+        try:
+            st = os.stat(video_path)
+        except OSError:
+            return None
+        return os.path.abspath(video_path), st.st_size, st.st_mtime_ns
+
+    def _key(self, identity: Tuple[str, int, int], size: Tuple[int, int], kind: str) -> str:
+        path, file_size, mtime_ns = identity
+        raw = f"{path}|{file_size}|{mtime_ns}|{size[0]}x{size[1]}|{kind}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".jpg")
+
+    def get(self, video_path: str, size: Tuple[int, int], kind: str = "thumb") -> Optional[np.ndarray]:
+        """读取缓存的BGR图像，未命中返回None"""
+        identity = self.file_identity(video_path)
+        if identity is None:
+            return None
+        key = self._key(identity, size, kind)
+        with self._lock:
+            row = self.db.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        data = np.fromfile(self._file(key), dtype=np.uint8) if os.path.exists(self._file(key)) else None
+        image = cv2.imdecode(data, cv2.IMREAD_COLOR) if data is not None and data.size else None
+        with self._lock:
+            if image is None:
+                self._remove(key)
+                self.db.commit()
+                return None
+            self._touched[key] = time.time()
+            if len(self._touched) >= self.FLUSH_EVERY:
+                self._flush_touched()
+        return image
+
+    def put(self, video_path: str, size: Tuple[int, int], image: np.ndarray, kind: str = "thumb", quality: int = 90):
+        """写入BGR图像"""
+        identity = self.file_identity(video_path)
+        if identity is None:
+            return
+        ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            return
+        key = self._key(identity, size, kind)
+        target = self._file(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f"{target}.{threading.get_ident()}.tmp"
+        encoded.tofile(tmp)
+        os.replace(tmp, target)
+
+        path, file_size, mtime_ns = identity
+        with self._lock:
+            # 同一文件同一规格的旧版本已失效
+            stale = self.db.execute(
+                "SELECT key FROM entries WHERE path = ? AND kind = ? AND width = ? AND height = ? AND key != ?",
+                (path, kind, size[0], size[1], key)).fetchall()
+            for (stale_key,) in stale:
+                self._remove(stale_key)
+            old = self.db.execute("SELECT bytes FROM entries WHERE key = ?", (key,)).fetchone()
+            if old:
+                self.total_bytes -= old[0]
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, path, file_size, mtime_ns, size[0], size[1], kind, int(encoded.size), time.time()))
+            self.total_bytes += int(encoded.size)
+            self._flush_touched()
+            self._evict()
+            self.db.commit()
+
+    def get_meta(self, video_path: str, name: str) -> Optional[str]:
+        """读取文件的附加数据，文件已变化或不存在时返回None"""
+        identity = self.file_identity(video_path)
+        if identity is None:
+            return None
+        path, file_size, mtime_ns = identity
+        with self._lock:
+            row = self.db.execute("SELECT size, mtime_ns, value FROM meta WHERE path = ? AND name = ?",
+                                  (path, name)).fetchone()
+        if row is None or row[0] != file_size or row[1] != mtime_ns:
+            return None
+        return row[2]
+
+    def put_meta(self, video_path: str, name: str, value: str):
+        """保存文件的附加数据"""
+        identity = self.file_identity(video_path)
+        if identity is None:
+            return
+        with self._lock:
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?, ?, ?, ?)", identity + (name, value))
+            self.db.commit()
+
+    def rename_path(self, old_path: str, new_path: str):
+        """文件被移动或改名后，把旧路径的缓存条目和附加数据转移到新路径
+
+        只转移大小和修改时间与新文件一致的条目，内容已变化的旧条目直接删除。
+        """
+        identity = self.file_identity(new_path)
+        if identity is None:
+            return
+        path, file_size, mtime_ns = identity
+        old_path = os.path.abspath(old_path)
+        if old_path == path:
+            return
+        with self._lock:
+            self._flush_touched()
+            rows = self.db.execute("SELECT key, size, mtime_ns, width, height, kind FROM entries WHERE path = ?",
+                                   (old_path,)).fetchall()
+            for key, size, mtime, width, height, kind in rows:
+                if (size, mtime) != (file_size, mtime_ns):
+                    self._remove(key)
+                    continue
+                new_key = self._key(identity, (width, height), kind)
+                self._remove(new_key)
+                try:
+                    os.makedirs(os.path.dirname(self._file(new_key)), exist_ok=True)
+                    os.replace(self._file(key), self._file(new_key))
+                except OSError:
+                    self._remove(key)
+                    continue
+                self.db.execute("UPDATE entries SET key = ?, path = ? WHERE key = ?", (new_key, path, key))
+            self.db.execute("DELETE FROM meta WHERE path = ? AND (size != ? OR mtime_ns != ?)",
+                            (old_path, file_size, mtime_ns))
+            self.db.execute("UPDATE OR REPLACE meta SET path = ? WHERE path = ?", (path, old_path))
+            self.db.commit()
+
+    def _remove(self, key: str):
+        row = self.db.execute("SELECT bytes FROM entries WHERE key = ?", (key,)).fetchone()
+        if row:
+            self.total_bytes -= row[0]
+            self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self._touched.pop(key, None)
+        try:
+            os.remove(self._file(key))
+        except OSError:
+            pass
+
+    def _flush_touched(self):
+        if self._touched:
+            self.db.executemany("UPDATE entries SET last_access = ? WHERE key = ?",
+                                [(t, k) for k, t in self._touched.items()])
+            self._touched.clear()
+            self.db.commit()
+
+    def _evict(self):
+        """按最近访问时间淘汰，直到总大小回到预算内"""
+        while self.total_bytes > self.max_bytes:
+            rows = self.db.execute("SELECT key FROM entries ORDER BY last_access LIMIT 32").fetchall()
+            if not rows:
+                break
+            for (key,) in rows:
+                self._remove(key)
+                if self.total_bytes <= self.max_bytes:
+                    break
+
+    def close(self):
+        """写回访问记录并关闭索引"""
+        with self._lock:
+            self._flush_touched()
+            self.db.close()
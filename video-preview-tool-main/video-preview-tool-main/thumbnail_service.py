@@ -0,0 +1,355 @@
+import itertools
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+from PyQt6.QtCore import QObject, QRunnable, QThread, QThreadPool, Qt, pyqtSignal
+from PyQt6.QtGui import QColor, QImage, QPainter, QPixmap
+
+from frame_presenter import letterbox_into, wrap_bgr
+from keyframe_index import KeyframeIndex
+from thumbnail_cache import ThumbnailDiskCache
+
+POSTER_SAMPLES = 6  # 选取封面时的候选帧数
+POSTER_RANGE = (0.1, 0.6)  # 候选帧在片段中的位置范围，避开片头淡入和片尾字幕
+SCORE_SIZE = (64, 36)  # 打分用的灰度小图尺寸
+
+
+def open_capture(video_path: str, hw_accel: bool = False) -> cv2.VideoCapture:
+    """打开视频用于生成预览尺寸的画面（可在工作线程中调用）
+
+    hw_accel为True时通过FFmpeg后端请求硬件解码，高分辨率片源的解码不再占满CPU。
+    硬件解码的初始化有固定开销，只在需要连续解码多帧时使用；OpenCV或系统不支持时
+    退回到软件解码。
+    """
+    accel = getattr(cv2, "CAP_PROP_HW_ACCELERATION", None)
+    if hw_accel and accel is not None:
+        try:
+            cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [accel, cv2.VIDEO_ACCELERATION_ANY])
+            if cap.isOpened():
+                return cap
+            cap.release()
+        except (cv2.error, TypeError):
+            pass
+    return cv2.VideoCapture(video_path)
+
+
+def decode_thumbnail(video_path: str, size: Tuple[int, int]) -> Optional[np.ndarray]:
+    """解码视频首帧并居中缩放到目标尺寸，返回BGR图像（可在工作线程中调用）"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        ret, frame = cap.read()
+    finally:
+        cap.release()
+    if not ret:
+        return None
+    return letterbox_into(frame, np.zeros((size[1], size[0], 3), dtype=np.uint8))
+
+
+def score_frames(samples: np.ndarray) -> np.ndarray:
+    """为一组候选帧打分，分数越高越适合作为封面
+
+    samples为 (N, 高, 宽) 的uint8灰度图。对比度（标准差）和边缘能量（相邻像素差
+    的均值）分别按本组最大值归一化后相加；平均亮度过低或过高的画面（黑场、淡入、
+    白场）再乘以趋近于0的曝光系数。
+    """
+    pixels = samples.astype(np.float32) / 255.0
+    brightness = pixels.mean(axis=(1, 2))
+    contrast = pixels.std(axis=(1, 2))
+    edges = (np.abs(np.diff(pixels, axis=1)).mean(axis=(1, 2)) +
+             np.abs(np.diff(pixels, axis=2)).mean(axis=(1, 2)))
+    score = contrast / max(float(contrast.max()), 1e-6) + edges / max(float(edges.max()), 1e-6)
+    exposure = np.clip(np.minimum(brightness, 1.0 - brightness) / 0.15, 0.0, 1.0)
+    return score * exposure
+
+
+def decode_poster(video_path: str, size: Tuple[int, int],
+                  frame_no: Optional[int] = None) -> Optional[Tuple[np.ndarray, int]]:
+    """选取最有代表性的一帧作为封面，返回 (BGR图像, 帧号)（可在工作线程中调用）
+
+    frame_no已知（之前选过）时直接解码该帧，否则在 POSTER_RANGE 内均匀取
+    POSTER_SAMPLES 帧，只缩成灰度小图用 score_frames 打分，最后只把得分最高的
+    一帧缩放成封面。已有缓存的关键帧索引时候选位置吸附到附近的关键帧，定位后
+    只需解码一帧。
+    """
+    cap = open_capture(video_path, hw_accel=frame_no is None)
+    try:
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        if frame_no is not None:
+            positions = [frame_no]
+        elif total > POSTER_SAMPLES:
+            start, end = total * POSTER_RANGE[0], total * POSTER_RANGE[1]
+            stride = (end - start) / POSTER_SAMPLES
+            positions = np.linspace(start, end, POSTER_SAMPLES).astype(int).tolist()
+            keyframes = KeyframeIndex.load(video_path, build=False)
+            if keyframes is not None:
+                # 只吸附到半个间隔以内的关键帧，候选帧仍然分散在整个范围内
+                positions = [k if abs(k - pos) <= stride / 2 else pos
+                             for pos, k in ((pos, keyframes.nearest(pos)) for pos in positions)]
+        else:
+            positions = [0]
+        samples, decoded = [], []
+        frame = None  # 各帧复用同一块解码缓冲区
+        for pos in positions:
+            if pos:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, pos)
+            ret, frame = cap.read(frame)
+            if not ret:
+                frame = None
+                continue
+            samples.append(cv2.cvtColor(cv2.resize(frame, SCORE_SIZE, interpolation=cv2.INTER_AREA),
+                                        cv2.COLOR_BGR2GRAY))
+            decoded.append(pos)
+        if not decoded:
+            return None
+        best = int(np.argmax(score_frames(np.stack(samples)))) if len(decoded) > 1 else 0
+        if best != len(decoded) - 1:
+            # 缓冲区中只保留最后读取的一帧，重新读取得分最高的那一帧
+            cap.set(cv2.CAP_PROP_POS_FRAMES, decoded[best])
+            ret, frame = cap.read(frame)
+            if not ret:
+                return None
+    finally:
+        cap.release()
+    return letterbox_into(frame, np.zeros((size[1], size[0], 3), dtype=np.uint8)), decoded[best]
+
+
+def decode_sprite_sheet(video_path: str, tile_size: Tuple[int, int], frames: int) -> Optional[np.ndarray]:
+    """在视频中均匀取frames帧，横向拼成一张雪碧图（可在工作线程中调用）
+
+    每帧取自对应区间的中点；该视频已有缓存的关键帧索引且区间内有关键帧时改用
+    离中点最近的关键帧，定位后只需解码一帧。这里不建立索引（需要读取整个文件）。
+    读取失败的位置留黑，整段视频都无法读取时返回None。
+    """
+    tile_w, tile_h = tile_size
+    keyframes = KeyframeIndex.load(video_path, build=False)
+    cap = open_capture(video_path, hw_accel=True)
+    try:
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        if total <= 0:
+            return None
+        sheet = np.zeros((tile_h, tile_w * frames, 3), dtype=np.uint8)
+        decoded = 0
+        frame = None  # 各帧复用同一块解码缓冲区
+        for index in range(frames):
+            frame_no = int((index + 0.5) * total / frames)
+            if keyframes is not None:
+                keyframe = keyframes.nearest(frame_no)
+                # 只在本区间内吸附，关键帧间隔很长时各格仍取不同的画面
+                if index * total / frames <= keyframe < (index + 1) * total / frames:
+                    frame_no = keyframe
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_no)
+            ret, frame = cap.read(frame)
+            if not ret:
+                frame = None
+                continue
+            # 直接缩放到雪碧图中对应的位置
+            letterbox_into(frame, sheet[:, index*tile_w:(index+1)*tile_w])
+            decoded += 1
+    finally:
+        cap.release()
+    return sheet if decoded else None
+
+
+def render_thumbnail(video_path: str, size: Tuple[int, int],
+                     disk_cache: Optional[ThumbnailDiskCache] = None) -> Optional[np.ndarray]:
+    """生成BGR封面缩略图，优先读取磁盘缓存（可在工作线程中调用）
+
+    选中的封面帧号也保存在磁盘缓存中，换一个尺寸重新生成时只需解码这一帧。
+    """
+    frame = disk_cache.get(video_path, size, "poster") if disk_cache else None
+    if frame is None:
+        known = disk_cache.get_meta(video_path, "poster_frame") if disk_cache else None
+        result = decode_poster(video_path, size, int(known) if known is not None else None)
+        if result is None:
+            # 无法定位时退回到首帧
+            frame = decode_thumbnail(video_path, size)
+            if frame is None:
+                return None
+        else:
+            frame, frame_no = result
+            if disk_cache and known is None:
+                disk_cache.put_meta(video_path, "poster_frame", str(frame_no))
+        if disk_cache:
+            disk_cache.put(video_path, size, frame, "poster")
+    return frame
+
+
+def render_sprite_sheet(video_path: str, tile_size: Tuple[int, int], frames: int,
+                        disk_cache: Optional[ThumbnailDiskCache] = None) -> Optional[np.ndarray]:
+    """生成悬停预览用的BGR雪碧图，优先读取磁盘缓存（可在工作线程中调用）"""
+    kind = f"sprite{frames}"
+    sheet = disk_cache.get(video_path, tile_size, kind) if disk_cache else None
+    if sheet is None:
+        sheet = decode_sprite_sheet(video_path, tile_size, frames)
+        if sheet is None:
+            return None
+        if disk_cache:
+            disk_cache.put(video_path, tile_size, sheet, kind, quality=80)
+    return sheet
+
+
+def placeholder_pixmap(width: int, height: int) -> QPixmap:
+    """缩略图生成前显示的占位图（仅限GUI线程）"""
+    pixmap = QPixmap(width, height)
+    pixmap.fill(QColor("#1E1E1E"))
+    painter = QPainter(pixmap)
+    painter.setPen(QColor("#888888"))
+    painter.drawText(pixmap.rect(), Qt.AlignmentFlag.AlignCenter, "加载中...")
+    painter.end()
+    return pixmap
+
+
+class PixmapCache:
+    """按 (路径, 宽, 高, 类型) 缓存已渲染图片的内存LRU（仅限GUI线程）"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._items: "OrderedDict[Tuple[str, int, int, str], QPixmap]" = OrderedDict()
+
+    @staticmethod
+    def _cost(pixmap: QPixmap) -> int:
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+    def get(self, key: Tuple[str, int, int, str]) -> Optional[QPixmap]:
+        pixmap = self._items.get(key)
+        if pixmap is not None:
+            self._items.move_to_end(key)
+        return pixmap
+
+    def put(self, key: Tuple[str, int, int, str], pixmap: QPixmap):
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.total_bytes -= self._cost(old)
+        self._items[key] = pixmap
+        self.total_bytes += self._cost(pixmap)
+        while self.total_bytes > self.max_bytes and len(self._items) > 1:
+            _, evicted = self._items.popitem(last=False)
+            self.total_bytes -= self._cost(evicted)
+
+    def discard(self, video_path: str):
+        """移除某个视频的所有尺寸和类型"""
+        for key in [k for k in self._items if k[0] == video_path]:
+            self.total_bytes -= self._cost(self._items.pop(key))
+
+
+class _ThumbnailJob(QRunnable):
+    def __init__(self, service: "ThumbnailService", job_id: int, render: Callable[..., Optional[np.ndarray]], args: tuple):
+        super().__init__()
+        self.service = service
+        self.job_id = job_id
+        self.render = render
+        self.args = args
+
+    def run(self):
+        # 卡片在排队期间被删除，直接丢弃
+        if not self.service.is_pending(self.job_id):
+            return
+        try:
+            frame = self.render(*self.args, self.service.disk_cache)
+        except Exception as e:
+            print(f"Error loading thumbnail: {str(e)}")
+            frame = None
+        if self.service.is_pending(self.job_id):
+            # 直接传递numpy数组，由GUI线程包装为QImage，工作线程中不做颜色转换和复制
+            self.service._job_done.emit(self.job_id, frame)
+
+
+class ThumbnailService(QObject):
+    """后台缩略图生成服务
+
+    任务在线程池中解码，结果通过信号回到GUI线程，转换为QPixmap存入内存LRU后
+    再调用请求方的回调。
+    """
+
+    thumbnail_ready = pyqtSignal(str, QImage)  # 视频路径, 缩略图
+    _job_done = pyqtSignal(int, object)  # 任务号, BGR数组或None
+
+    _shared = None
+
+    def __init__(self, max_workers: int = 0, disk_cache: Optional[ThumbnailDiskCache] = None):
+        super().__init__()
+        if disk_cache is None:
+            try:
+                disk_cache = ThumbnailDiskCache()
+            except (OSError, sqlite3.Error) as e:
+                print(f"Thumbnail cache disabled: {str(e)}")
+        self.disk_cache = disk_cache
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_workers or max(2, QThread.idealThreadCount() // 2))
+        self.pixmap_cache = PixmapCache()
+        self._pending: Dict[int, Tuple[Tuple[str, int, int, str], Callable[[QPixmap], None]]] = {}
+        self._lock = threading.Lock()
+        self._job_ids = itertools.count(1)
+        self._job_done.connect(self._on_job_done)
+
+    @classmethod
+    def instance(cls) -> "ThumbnailService":
+        """获取全局缩略图服务"""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def cached_pixmap(self, video_path: str, size: Tuple[int, int], kind: str = "thumb") -> Optional[QPixmap]:
+        """查询内存中已渲染的图片"""
+        return self.pixmap_cache.get((video_path, size[0], size[1], kind))
+
+    def request(self, video_path: str, size: Tuple[int, int], callback: Callable[[QPixmap], None]) -> int:
+        """提交缩略图任务，完成后在GUI线程调用callback(pixmap)，失败时pixmap为空"""
+        return self._submit((video_path, size[0], size[1], "thumb"), callback,
+                            render_thumbnail, (video_path, size))
+
+    def request_sprite(self, video_path: str, tile_size: Tuple[int, int], frames: int,
+                       callback: Callable[[QPixmap], None]) -> int:
+        """提交雪碧图任务（frames个tile_size大小的帧横向排列），回调约定同request"""
+        return self._submit((video_path, tile_size[0], tile_size[1], f"sprite{frames}"), callback,
+                            render_sprite_sheet, (video_path, tile_size, frames))
+
+    def _submit(self, key: Tuple[str, int, int, str], callback: Callable[[QPixmap], None],
+                render: Callable[..., Optional[np.ndarray]], args: tuple) -> int:
+        job_id = next(self._job_ids)
+        with self._lock:
+            self._pending[job_id] = (key, callback)
+        self.pool.start(_ThumbnailJob(self, job_id, render, args))
+        return job_id
+
+    def cancel(self, job_id: int):
+        """取消任务，尚未开始的任务不会再解码，已完成的结果会被丢弃"""
+        with self._lock:
+            self._pending.pop(job_id, None)
+
+    def shutdown(self):
+        """等待正在执行的任务结束并关闭磁盘缓存"""
+        with self._lock:
+            self._pending.clear()
+        self.pool.clear()
+        self.pool.waitForDone()
+        if self.disk_cache:
+            self.disk_cache.close()
+            self.disk_cache = None
+
+    def is_pending(self, job_id: int) -> bool:
+        with self._lock:
+            return job_id in self._pending
+
+    def _on_job_done(self, job_id: int, frame: Optional[np.ndarray]):
+        with self._lock:
+            entry = self._pending.pop(job_id, None)
+        if entry is None:
+            return
+        key, callback = entry
+        if frame is None:
+            callback(QPixmap())
+            return
+        # frame在本作用域内保持存活，QPixmap.fromImage完成唯一一次复制
+        image = wrap_bgr(frame)
+        pixmap = QPixmap.fromImage(image)
+        self.pixmap_cache.put(key, pixmap)
+        if key[3] == "thumb" and self.receivers(self.thumbnail_ready) > 0:
+            # 接收方可能保存QImage，需要独立持有内存
+            self.thumbnail_ready.emit(key[0], image.copy())
+        callback(pixmap)
@@ -1,15 +1,33 @@
 import vlc
 from PyQt6.QtWidgets import QWidget, QLabel, QVBoxLayout, QHBoxLayout, QPushButton, QSlider
-from PyQt6.QtCore import Qt, QTimer, QSize
-from PyQt6.QtGui import QImage, QPixmap, QIcon
+from PyQt6.QtCore import Qt, QTimer, QSize, QObject, pyqtSignal
+from PyQt6.QtGui import QPixmap, QPainter, QColor
 import cv2
 import tkinter as tk
 from PIL import Image, ImageTk
 import threading
-from typing import Optional, Callable
+import queue
+from typing import List, Optional, Callable
 import time
-import platform
 import numpy as np
+from thumbnail_service import ThumbnailService, open_capture, placeholder_pixmap
+from keyframe_index import KeyframeIndex
+from playback import PlaybackClock
+from frame_presenter import LetterboxBuffer
+from vlc_manager import VLCInstanceManager, bind_window
+
+SCRUB_FRAMES = 10  # 悬停预览雪碧图的帧数
+SCRUB_TILE_SCALE = 0.5  # 雪碧图每帧相对预览区域的缩放比例
+
+# 卡片只以几百像素的尺寸显示，优先硬件解码并跳过环路滤波以降低高分辨率片源的解码开销
+PREVIEW_MEDIA_OPTIONS = (":avcodec-hw=any", ":avcodec-fast", ":avcodec-skiploopfilter=4")
+IDLE_RELEASE_MS = 30000  # 暂停超过该时长后释放libvlc资源，再次播放时从原位置继续
+
+
+class PlayerEvents(QObject):
+    """把libvlc线程中的事件转发到GUI线程"""
+    end_reached = pyqtSignal()
+
 
 class VideoPlayer:
     def __init__(self, video_path: str, preview_widget: QLabel):
@@ -17,32 +35,161 @@ class VideoPlayer:
         self.preview_widget = preview_widget
         self.is_playing = False
         self.playback_speed = 1.0
+        self.volume = 100
+        self.muted = False
+        self.on_revoked: Optional[Callable] = None  # 播放器被抢占时的回调
+        self.idle_release_ms = IDLE_RELEASE_MS
         
-        # 创建VLC实例和播放器
-        self.instance = vlc.Instance()
-        self.player = self.instance.media_player_new()
-        self.media = self.instance.media_new(self.video_path)
-        self.player.set_media(self.media)
+        # libvlc播放器、媒体和原生渲染窗口都在首次播放时才创建，未播放的卡片只是一张缩略图
+        self.vlc_manager = VLCInstanceManager.instance()
+        self.player: Optional[vlc.MediaPlayer] = None
+        self.media: Optional[vlc.Media] = None
+        self.surface: Optional[QWidget] = None
+        self._idle_timer: Optional[QTimer] = None
+        self._resume_ms = 0  # 资源被释放时的播放位置，下次播放从这里继续
         
-        # 设置播放窗口
-        if platform.system() == "Windows":
-            self.player.set_hwnd(int(self.preview_widget.winId()))
-        elif platform.system() == "Darwin":  # macOS
-            self.player.set_nsobject(int(self.preview_widget.winId()))
-        else:  # Linux
-            self.player.set_xwindow(self.preview_widget.winId())
-            
-        # 设置视频输出比例
-        self.player.video_set_scale(0)  # 0表示自动缩放
-        self.player.video_set_aspect_ratio("16:9")  # 设置默认比例
+        # libvlc事件回调缓存的播放时间和总时长，避免定时轮询ctypes接口
+        self.events = PlayerEvents()
+        self._events_attached = False
+        self._time = 0
+        self._length = 0
         
         # 加载缩略图
+        self.thumbnail_service = ThumbnailService.instance()
+        self._thumbnail_job: Optional[int] = None
+        self._thumbnail: Optional[QPixmap] = None  # 首次渲染的缩略图，停止播放时直接复用
+        
+        # 鼠标悬停预览使用的雪碧图，首次悬停时才生成
+        self._sprite: Optional[QPixmap] = None
+        self._sprite_job: Optional[int] = None
+        self._scrub_tiles: List[Optional[QPixmap]] = []
+        self._scrub_fraction: Optional[float] = None
+        self._scrub_index: Optional[int] = None
         self.load_thumbnail()
         
+    def _acquire_player(self) -> vlc.MediaPlayer:
+        """从共享池借出播放器并恢复本卡片的播放设置"""
+        if self.player is None:
+            self.player = self.vlc_manager.acquire(self)
+            if self.media is None:
+                options = PREVIEW_MEDIA_OPTIONS
+                if self._resume_ms:
+                    options += (f":start-time={self._resume_ms / 1000:.3f}",)
+                self.media = self.vlc_manager.media_new(self.video_path, *options)
+            self.player.set_media(self.media)
+            
+            # 设置播放窗口：在预览区域上叠加独立的原生子窗口，释放时一并销毁，
+            # 预览标签本身保持为普通控件
+            self.surface = QWidget(self.preview_widget)
+            self.surface.setAttribute(Qt.WidgetAttribute.WA_DontCreateNativeAncestors)
+            self.surface.setAttribute(Qt.WidgetAttribute.WA_NativeWindow)
+            self.surface.setStyleSheet("background: black;")
+            self.surface.setGeometry(self.preview_widget.rect())
+            self.surface.show()
+            bind_window(self.player, int(self.surface.winId()))
+            
+            # 设置视频输出比例
+            self.player.video_set_scale(0)  # 0表示自动缩放
+            self.player.video_set_aspect_ratio("16:9")  # 设置默认比例
+            self.player.audio_set_volume(int(self.volume))
+            self.player.audio_set_mute(self.muted)
+            self.player.set_rate(self.playback_speed)
+            self._attach_events()
+        else:
+            self.vlc_manager.touch(self)
+        return self.player
+        
+    def _release_player(self, remember_position: bool = False):
+        """归还播放器到共享池并释放媒体和渲染窗口
+        
+        remember_position为True时记住当前位置，下次播放从这里继续。
+        """
+        self._stop_idle_timer()
+        if self.player is not None:
+            self._detach_events()
+            self.player = None
+            self.vlc_manager.release(self)
+            if remember_position:
+                self._resume_ms = self._time
+            self._time = 0
+        if not remember_position:
+            self._resume_ms = 0
+        if self.media is not None:
+            self.media.release()
+            self.media = None
+        if self.surface is not None:
+            self.surface.hide()
+            self.surface.deleteLater()
+            self.surface = None
+            
+    def _start_idle_timer(self):
+        """暂停后开始计时，超时释放libvlc资源"""
+        if self.idle_release_ms <= 0:
+            return
+        if self._idle_timer is None:
+            self._idle_timer = QTimer()
+            self._idle_timer.setSingleShot(True)
+            self._idle_timer.timeout.connect(self._on_idle)
+        self._idle_timer.start(self.idle_release_ms)
+        
+    def _stop_idle_timer(self):
+        if self._idle_timer is not None:
+            self._idle_timer.stop()
+            
+    def _on_idle(self):
+        """暂停时间过长，释放播放器并显示缩略图"""
+        if not self.is_playing and self.player is not None:
+            self._release_player(remember_position=True)
+            self.load_thumbnail()
+            
+    def _attach_events(self):
+        """订阅播放时间、时长和播放结束事件"""
+        em = self.player.event_manager()
+        try:
+            self._events_attached = all(r == 0 for r in (
+                em.event_attach(vlc.EventType.MediaPlayerTimeChanged, self._on_time_changed),
+                em.event_attach(vlc.EventType.MediaPlayerLengthChanged, self._on_length_changed),
+                em.event_attach(vlc.EventType.MediaPlayerEndReached, self._on_end_reached),
+            ))
+        except (vlc.VLCException, NotImplementedError):
+            self._events_attached = False
+            
+    def _detach_events(self):
+        """播放器归还前取消订阅，避免复用时回调到旧卡片"""
+        em = self.player.event_manager()
+        for event_type in (vlc.EventType.MediaPlayerTimeChanged,
+                           vlc.EventType.MediaPlayerLengthChanged,
+                           vlc.EventType.MediaPlayerEndReached):
+            try:
+                em.event_detach(event_type)
+            except (vlc.VLCException, NotImplementedError):
+                pass
+        self._events_attached = False
+        
+    # 以下回调运行在libvlc线程中，只能记录数据或发出信号，不能调用libvlc接口
+    def _on_time_changed(self, event):
+        self._time = event.u.new_time
+        
+    def _on_length_changed(self, event):
+        self._length = event.u.new_length
+        
+    def _on_end_reached(self, event):
+        self.events.end_reached.emit()
+            
+    def revoke_player(self):
+        """播放器被其他卡片抢占"""
+        self._release_player(remember_position=True)
+        self.is_playing = False
+        self.load_thumbnail()
+        if self.on_revoked:
+            self.on_revoked()
+        
     def play(self):
         """开始播放"""
         if not self.is_playing:
-            self.player.play()
+            self.end_scrub(restore=False)
+            self._stop_idle_timer()
+            self._acquire_player().play()
             self.is_playing = True
             
     def pause(self):
@@ -50,159 +197,480 @@ class VideoPlayer:
         if self.is_playing:
             self.player.pause()
             self.is_playing = False
+            self._start_idle_timer()
             
     def stop(self):
         """停止播放"""
-        self.player.stop()
+        self._release_player()
         self.is_playing = False
         self.load_thumbnail()  # 显示缩略图
         
     def seek(self, position: float):
         """设置播放位置（0-100）"""
-        self.player.set_position(position / 100.0)
+        if self.player is not None:
+            self.player.set_position(position / 100.0)
+        elif self._length > 0:
+            # 资源已释放，记下位置供下次播放使用
+            self._resume_ms = int(self._length * position / 100.0)
         
     def set_volume(self, volume: float):
         """设置音量（0-100）"""
-        self.player.audio_set_volume(int(volume))
+        self.volume = volume
+        if self.player is not None:
+            self.player.audio_set_volume(int(volume))
+        
+    def set_muted(self, muted: bool):
+        """静音（例如被调度到后台播放时）"""
+        self.muted = muted
+        if self.player is not None:
+            self.player.audio_set_mute(muted)
+        
+    def get_resume_time(self) -> int:
+        """当前播放位置，资源已释放时为记住的位置（毫秒）"""
+        if self.player is not None:
+            return self.get_time()
+        return self._resume_ms
+        
+    def set_resume_time(self, ms: int):
+        """设置下次播放的起始位置（毫秒），仅在未持有播放器时有效"""
+        if self.player is None:
+            self._resume_ms = ms
         
     def get_position(self) -> float:
         """获取当前播放位置（0-100）"""
+        if self.player is None:
+            return 0.0
         return self.player.get_position() * 100
         
     def cleanup(self):
         """清理资源"""
-        self.stop()
-        self.player.release()
-        self.instance.release()
+        self._release_player()
+        self.is_playing = False
+        self._cancel_thumbnail()
+        self._cancel_sprite()
+        self.end_scrub(restore=False)
+        self._sprite = None
+        self._scrub_tiles = []
+        
+    def set_video_path(self, video_path: str):
+        """文件被移动后切换到新路径，沿用已渲染的缩略图"""
+        self._release_player()
+        self.is_playing = False
+        if self._thumbnail is not None:
+            size = self._thumbnail.size()
+            self.thumbnail_service.pixmap_cache.put((video_path, size.width(), size.height(), "thumb"), self._thumbnail)
+        self._cancel_sprite()
+        self.end_scrub(restore=False)
+        self._sprite = None
+        self._scrub_tiles = []
+        self.video_path = video_path
+        self.load_thumbnail()
         
     def load_thumbnail(self):
-        """加载视频缩略图"""
-        try:
-            cap = cv2.VideoCapture(self.video_path)
-            ret, frame = cap.read()
-            if ret:
-                # 获取视频的原始尺寸
-                video_h, video_w = frame.shape[:2]
-                preview_w = self.preview_widget.width()
-                preview_h = self.preview_widget.height()
-                
-                # 计算缩放比例，保持宽高比
-                scale = min(preview_w/video_w, preview_h/video_h)
-                new_w = int(video_w * scale)
-                new_h = int(video_h * scale)
-                
-                # 调整帧大小
-                frame = cv2.resize(frame, (new_w, new_h))
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                
-                # 创建一个黑色背景
-                background = np.zeros((preview_h, preview_w, 3), dtype=np.uint8)
-                
-                # 计算居中位置
-                y_offset = (preview_h - new_h) // 2
-                x_offset = (preview_w - new_w) // 2
-                
-                # 将调整后的帧放在黑色背景上
-                background[y_offset:y_offset+new_h, x_offset:x_offset+new_w] = frame
+        """加载视频缩略图（优先使用已渲染的缩略图，否则后台解码并先显示占位图）"""
+        self._cancel_thumbnail()
+        size = (self.preview_widget.width(), self.preview_widget.height())
+        if self._thumbnail is None or self._thumbnail.size() != QSize(*size):
+            self._thumbnail = self.thumbnail_service.cached_pixmap(self.video_path, size)
+        if self._thumbnail is not None:
+            self.preview_widget.setPixmap(self._thumbnail)
+            return
+        self.preview_widget.setPixmap(placeholder_pixmap(*size))
+        self._thumbnail_job = self.thumbnail_service.request(
+            self.video_path, size, self._on_thumbnail_ready)
+        
+    def _on_thumbnail_ready(self, pixmap: QPixmap):
+        """缩略图生成完成"""
+        self._thumbnail_job = None
+        if pixmap.isNull():
+            return
+        self._thumbnail = pixmap
+        if not self.is_playing and self._scrub_index is None:
+            self.preview_widget.setPixmap(pixmap)
+        
+    def _cancel_thumbnail(self):
+        """丢弃尚未完成的缩略图任务"""
+        if self._thumbnail_job is not None:
+            self.thumbnail_service.cancel(self._thumbnail_job)
+            self._thumbnail_job = None
+            
+    def scrub(self, fraction: float):
+        """鼠标悬停预览：按水平位置（0-1）显示雪碧图中对应的帧，不启动libvlc"""
+        if self.player is not None:
+            # 已有播放会话时预览区域显示的是视频画面
+            return
+        self._scrub_fraction = min(max(fraction, 0.0), 1.0)
+        if self._sprite is None:
+            self._load_sprite()
+            return
+        if self._sprite.isNull():
+            return
+        index = min(int(self._scrub_fraction * SCRUB_FRAMES), SCRUB_FRAMES - 1)
+        if index == self._scrub_index:
+            return
+        self._scrub_index = index
+        self.preview_widget.setPixmap(self._scrub_tile(index))
+        
+    def end_scrub(self, restore: bool = True):
+        """鼠标离开预览区域，恢复缩略图
+        
+        正在生成的雪碧图不取消，完成后写入缓存，下次悬停时直接使用。
+        """
+        self._scrub_fraction = None
+        if self._scrub_index is not None:
+            self._scrub_index = None
+            if restore and self.player is None:
+                self.load_thumbnail()
                 
-                # 转换为QPixmap并显示
-                image = QImage(background.data, preview_w, preview_h, background.strides[0], QImage.Format.Format_RGB888)
-                pixmap = QPixmap.fromImage(image)
-                self.preview_widget.setPixmap(pixmap)
-            cap.release()
-        except Exception as e:
-            print(f"Error loading thumbnail: {str(e)}")
+    def _load_sprite(self):
+        """读取或后台生成雪碧图"""
+        tile_size = self._sprite_tile_size()
+        self._sprite = self.thumbnail_service.cached_pixmap(self.video_path, tile_size, f"sprite{SCRUB_FRAMES}")
+        if self._sprite is not None:
+            self._on_sprite_ready(self._sprite)
+        elif self._sprite_job is None:
+            self._sprite_job = self.thumbnail_service.request_sprite(
+                self.video_path, tile_size, SCRUB_FRAMES, self._on_sprite_ready)
+            
+    def _cancel_sprite(self):
+        """丢弃尚未完成的雪碧图任务（卡片不再显示该视频时）"""
+        if self._sprite_job is not None:
+            self.thumbnail_service.cancel(self._sprite_job)
+            self._sprite_job = None
+            
+    def _sprite_tile_size(self):
+        return (max(1, int(self.preview_widget.width() * SCRUB_TILE_SCALE)),
+                max(1, int(self.preview_widget.height() * SCRUB_TILE_SCALE)))
+        
+    def _on_sprite_ready(self, pixmap: QPixmap):
+        """雪碧图就绪，鼠标仍在预览区域上时立即显示对应的帧"""
+        self._sprite_job = None
+        self._sprite = pixmap  # 生成失败时保存空图，不再重复请求
+        if pixmap.isNull():
+            return
+        self._scrub_tiles = [None] * SCRUB_FRAMES
+        if self._scrub_fraction is not None:
+            self.scrub(self._scrub_fraction)
+            
+    def _scrub_tile(self, index: int) -> QPixmap:
+        """从雪碧图切出一帧，放大到预览尺寸并在底部画出位置指示条"""
+        tile = self._scrub_tiles[index]
+        if tile is None:
+            tile_w = self._sprite.width() // SCRUB_FRAMES
+            tile = self._sprite.copy(index * tile_w, 0, tile_w, self._sprite.height()).scaled(
+                self.preview_widget.size(), Qt.AspectRatioMode.IgnoreAspectRatio,
+                Qt.TransformationMode.SmoothTransformation)
+            painter = QPainter(tile)
+            bar_w = tile.width() * (index + 1) // SCRUB_FRAMES
+            painter.fillRect(0, tile.height() - 3, bar_w, 3, QColor("#42B883"))
+            painter.end()
+            self._scrub_tiles[index] = tile
+        return tile
             
     def set_playback_speed(self, speed: float):
         """设置播放速度"""
-        self.player.set_rate(speed)
+        if self.player is not None:
+            self.player.set_rate(speed)
         self.playback_speed = speed
 
     def get_time(self):
         """获取当前播放时间（毫秒）"""
+        if self.player is None:
+            return 0
+        if self._events_attached:
+            return self._time
         return self.player.get_time()
         
     def get_duration(self):
         """获取视频总时长（毫秒）"""
-        return self.player.get_length()
+        if self._events_attached and self._length > 0:
+            return self._length
+        if self.player is None:
+            return self._length
+        self._length = self.player.get_length()
+        return self._length
+
+class _FramePipeline:
+    """一次播放会话的帧流水线
+    
+    解码槽和显示槽的缓冲区都预先分配，各阶段之间只传递槽号。空闲槽号的数量
+    限制了每个阶段最多能领先多少帧。
+    """
+    
+    def __init__(self, source_shape, display_size, decode_slots: int, display_slots: int):
+        self.running = threading.Event()
+        self.running.set()
+        self.display_size = display_size
+        self.decode_buffers = [np.empty(source_shape, dtype=np.uint8) for _ in range(decode_slots)]
+        self.display_buffers = [LetterboxBuffer(display_size, rgb=True) for _ in range(display_slots)]
+        self.free_decode: "queue.Queue[int]" = queue.Queue()
+        self.decoded: "queue.Queue[tuple]" = queue.Queue()  # (解码槽, 帧号, 序号, 定位代数)
+        self.free_display: "queue.Queue[int]" = queue.Queue()
+        self.ready: "queue.Queue[tuple]" = queue.Queue()  # (显示槽, 帧号, 序号, 定位代数)
+        self.next_item: Optional[tuple] = None  # 已取出但尚未到显示时间的帧（仅限Tk线程）
+        for slot in range(decode_slots):
+            self.free_decode.put(slot)
+        for slot in range(display_slots):
+            self.free_display.put(slot)
+            
+    def take(self, q: queue.Queue):
+        """阻塞取出一项，流水线停止时返回None"""
+        while self.running.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+        
+    def stop(self):
+        self.running.clear()
+
 
 class VideoPlayerTk:
+    """基于OpenCV的Tk播放器
+    
+    解码线程把帧读入预分配的环形缓冲区，缩放线程把帧缩放到预览尺寸，Tk线程
+    通过 after() 轮询取出到时的帧显示。播放时钟按帧序号计算显示时刻，迟到的帧
+    在各阶段直接丢弃，保证1.0x/1.5x/2.0x播放都不落后于实际时间。
+    """
+    
+    DECODE_SLOTS = 6
+    DISPLAY_SLOTS = 3
+    POLL_MS = 5
+    
     def __init__(self, video_path: str, preview_label: tk.Label):
         self.video_path = video_path
         self.preview_label = preview_label
-        self.cap = cv2.VideoCapture(video_path)
+        self.cap = open_capture(video_path, hw_accel=True)
+        self.cap_lock = threading.Lock()  # 解码线程和seek共用同一个VideoCapture
         self.is_playing = False
-        self.current_frame = 0
+        self.current_frame = 0  # 下一个要显示的帧号
         self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
         self.fps = self.cap.get(cv2.CAP_PROP_FPS)
         self.thread: Optional[threading.Thread] = None
         self.on_frame_update: Optional[Callable] = None
         self.volume = 0.5  # 默认音量
+        self.playback_speed = 1.0
+        
+        self.clock = PlaybackClock(self.fps)
+        self.pipeline: Optional[_FramePipeline] = None
+        self._scale_thread: Optional[threading.Thread] = None
+        self._photo: Optional[ImageTk.PhotoImage] = None
+        self._after_id = None
+        self._decode_pos = 0  # VideoCapture下一次读取的帧号
+        self._seek_target: Optional[int] = None  # 精确定位的目标帧，解码线程逐帧解码到这里才开始输出
+        self._pending_seek: Optional[tuple] = None  # 播放中的定位请求，由解码线程执行
+        self._generation = 0  # 每次定位加一，旧位置的帧随之作废
+        
+        # 关键帧索引在后台读取或建立，完成前seek退回到OpenCV自身的定位
+        self.keyframes: Optional[KeyframeIndex] = None
+        threading.Thread(target=self._load_keyframes, daemon=True).start()
+        
+    def _load_keyframes(self):
+        try:
+            self.keyframes = KeyframeIndex.load(self.video_path)
+        except Exception as e:
+            print(f"Error building keyframe index: {str(e)}")
         
     def play(self):
-        if not self.is_playing:
-            self.is_playing = True
-            self.thread = threading.Thread(target=self._play_video)
-            self.thread.daemon = True
-            self.thread.start()
+        if self.is_playing:
+            return
+        display_size = (max(1, self.preview_label.winfo_width()), max(1, self.preview_label.winfo_height()))
+        source_shape = (int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 1,
+                        int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or 1, 3)
+        if self._photo is None or (self._photo.width(), self._photo.height()) != display_size:
+            self._photo = ImageTk.PhotoImage("RGB", display_size)
+            self.preview_label.configure(image=self._photo)
+            self.preview_label.image = self._photo
+            
+        with self.cap_lock:
+            if self._decode_pos != self.current_frame:
+                # 暂停时解码线程已经读到了前面，回到最后显示的位置
+                self._pending_seek = (self.current_frame, True)
+        self.pipeline = _FramePipeline(source_shape, display_size, self.DECODE_SLOTS, self.DISPLAY_SLOTS)
+        self.clock.start(0)
+        self.is_playing = True
+        self.thread = threading.Thread(target=self._decode_loop, args=(self.pipeline,), daemon=True)
+        self._scale_thread = threading.Thread(target=self._scale_loop, args=(self.pipeline,), daemon=True)
+        self.thread.start()
+        self._scale_thread.start()
+        self._after_id = self.preview_label.after(self.POLL_MS, self._present, self.pipeline)
             
     def pause(self):
         self.is_playing = False
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            self.pipeline = None
+        if self._after_id is not None:
+            self.preview_label.after_cancel(self._after_id)
+            self._after_id = None
         
-    def seek(self, position: float):
-        """设置视频播放位置（0-100）"""
+    def seek(self, position: float, accurate: bool = True):
+        """设置视频播放位置（0-100）
+        
+        accurate为True时总是落在目标帧：从前一个关键帧开始，由解码线程逐帧解码
+        到目标帧（不论关键帧间隔多长，调用方都不会被阻塞）；为False时直接跳到
+        最近的关键帧，适合拖动进度条时使用。
+        """
         frame_no = int((position / 100) * self.total_frames)
-        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_no)
-        self.current_frame = frame_no
+        with self.cap_lock:
+            self._generation += 1
+            if self.is_playing:
+                self._pending_seek = (frame_no, accurate)
+                self.current_frame = frame_no
+            else:
+                self._decode_pos = self._seek_frame(frame_no, accurate)
+                self.current_frame = frame_no if self._seek_target is not None else self._decode_pos
+            
+    def _seek_frame(self, frame_no: int, accurate: bool) -> int:
+        """定位到frame_no附近，返回VideoCapture下一次读取的帧号（调用方持有cap_lock）
+        
+        精确定位时只跳到前一个关键帧并记录_seek_target，剩余的帧由解码线程解码。
+        """
+        self._seek_target = None
+        index = self.keyframes
+        if index is None:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_no)
+            return frame_no
+        if not accurate:
+            target = index.nearest(frame_no)
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            return target
+        
+        keyframe = index.floor(frame_no)
+        if keyframe <= self._decode_pos <= frame_no:
+            # 目标在当前位置之后且属于同一关键帧区间，继续解码即可，无需重新定位
+            start = self._decode_pos
+        else:
+            start = keyframe
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        if start < frame_no:
+            self._seek_target = frame_no
+        return start
         
     def set_volume(self, volume: float):
         """设置音量（0-100）"""
         self.volume = volume / 100.0
         
-    def _play_video(self):
-        while self.is_playing:
-            ret, frame = self.cap.read()
-            if not ret:
-                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    def set_playback_speed(self, speed: float):
+        """设置播放速度"""
+        self.playback_speed = speed
+        self.clock.set_speed(speed)
+        
+    def _decode_loop(self, pipeline: _FramePipeline):
+        """解码线程：按顺序读帧填入空闲的解码槽"""
+        seq = 0
+        while True:
+            slot = pipeline.take(pipeline.free_decode)
+            if slot is None:
+                return
+            with self.cap_lock:
+                if not pipeline.running.is_set():
+                    return
+                if self._pending_seek is not None:
+                    frame_no, accurate = self._pending_seek
+                    self._pending_seek = None
+                    self._decode_pos = self._seek_frame(frame_no, accurate)
+                    self.clock.start(seq)
+                if self._seek_target is not None:
+                    # 精确定位：每次只grab一帧，期间释放锁以便新的定位请求取代这一次
+                    if self._decode_pos < self._seek_target and self.cap.grab():
+                        self._decode_pos += 1
+                    else:
+                        self._seek_target = None
+                        self.clock.start(seq)  # 解码到目标帧所用的时间不计入播放进度
+                    pipeline.free_decode.put(slot)
+                    continue
+                generation = self._generation
+                frame_no = self._decode_pos
+                if self.clock.lateness(seq) > self.clock.frame_interval:
+                    # 已经迟到的帧只解码不取出，跳过颜色转换和拷贝
+                    ret = self.cap.grab()
+                    frame = None
+                else:
+                    ret, frame = self.cap.read(pipeline.decode_buffers[slot])
+                if not ret:
+                    if frame_no == 0:
+                        return  # 无法读取任何帧
+                    # 播放到结尾后从头循环
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    self._decode_pos = 0
+                    pipeline.free_decode.put(slot)
+                    continue
+                self._decode_pos += 1
+            seq += 1
+            if frame is None:
+                pipeline.free_decode.put(slot)
                 continue
-                
-            # 调整帧大小以适应预览区域
-            height, width = frame.shape[:2]
-            preview_width = self.preview_label.winfo_width()
-            preview_height = self.preview_label.winfo_height()
-            
-            # 计算缩放比例
-            scale = min(preview_width/width, preview_height/height)
-            new_width = int(width * scale)
-            new_height = int(height * scale)
-            
-            # 调整大小
-            frame = cv2.resize(frame, (new_width, new_height))
+            # 源尺寸与预分配不一致时OpenCV会返回新数组，替换该槽的缓冲区
+            pipeline.decode_buffers[slot] = frame
+            pipeline.decoded.put((slot, frame_no, seq - 1, generation))
             
-            # 转换颜色空间
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # 转换为PhotoImage
-            image = Image.fromarray(frame)
-            photo = ImageTk.PhotoImage(image=image)
-            
-            # 更新预览
-            self.preview_label.configure(image=photo)
-            self.preview_label.image = photo
+    def _scale_loop(self, pipeline: _FramePipeline):
+        """缩放线程：把解码好的帧居中缩放到预览尺寸的显示槽中"""
+        while True:
+            item = pipeline.take(pipeline.decoded)
+            if item is None:
+                return
+            slot, frame_no, seq, generation = item
+            if generation != self._generation or self.clock.lateness(seq) > self.clock.frame_interval:
+                # 定位前的旧帧或已经迟到的帧不再缩放
+                pipeline.free_decode.put(slot)
+                continue
+            display_slot = pipeline.take(pipeline.free_display)
+            if display_slot is None:
+                return
+            # 缩放并转换颜色空间，原地写入显示槽中央，四周保持黑色
+            pipeline.display_buffers[display_slot].present(pipeline.decode_buffers[slot])
+            pipeline.free_decode.put(slot)
+            pipeline.ready.put((display_slot, frame_no, seq, generation))
             
-            # 更新当前帧
-            self.current_frame += 1
+    def _present(self, pipeline: _FramePipeline):
+        """Tk线程：显示已经到时的最新一帧，更早的帧直接丢弃"""
+        if not pipeline.running.is_set():
+            return
+        shown = None
+        while True:
+            if pipeline.next_item is None:
+                try:
+                    pipeline.next_item = pipeline.ready.get_nowait()
+                except queue.Empty:
+                    break
+            display_slot, frame_no, seq, generation = pipeline.next_item
+            if generation != self._generation:
+                pipeline.free_display.put(display_slot)
+                pipeline.next_item = None
+                continue
+            if self.clock.due(seq) > time.monotonic():
+                break
+            if shown is not None:
+                pipeline.free_display.put(shown[0])
+            shown = pipeline.next_item
+            pipeline.next_item = None
             
-            # 控制播放速度
-            time.sleep(1/self.fps)
+        if shown is not None:
+            display_slot, frame_no = shown[0], shown[1]
+            # 更新预览，PhotoImage复用同一块Tk图像
+            # （PIL的RGB模式不能直接引用numpy内存，frombuffer得到的是一次性拷贝，
+            # 必须在显示时从显示槽的当前内容创建图像）
+            self._photo.paste(Image.fromarray(pipeline.display_buffers[display_slot].canvas))
+            pipeline.free_display.put(display_slot)
+            self.current_frame = frame_no + 1
+            if self.on_frame_update:
+                self.on_frame_update()
+        self._after_id = self.preview_label.after(self.POLL_MS, self._present, pipeline)
             
     def get_current_position(self) -> float:
         """获取当前播放位置（0-100）"""
+        if self.total_frames <= 0:
+            return 0.0
         return (self.current_frame / self.total_frames) * 100
         
     def release(self):
         """释放资源"""
-        self.is_playing = False
-        if self.thread:
-            self.thread.join()
-        self.cap.release() 
\ No newline at end of file
+        self.pause()
+        for thread in (self.thread, self._scale_thread):
+            if thread:
+                thread.join()
+        with self.cap_lock:
+            self.cap.release()
@@ -0,0 +1,100 @@
+import threading
+import platform
+from collections import OrderedDict
+from typing import List, Optional
+
+import vlc
+
+
+class VLCInstanceManager:
+    """进程内共享的libvlc实例及MediaPlayer池
+
+    整个进程只创建一个 vlc.Instance，插件只加载一次；MediaPlayer 按需借出给
+    正在播放的卡片，停止后归还复用。池满时抢占最久未使用的持有者。
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_players: int = 4, vlc_args: Optional[List[str]] = None):
+        self.vlc_instance = vlc.Instance(*(vlc_args or []))
+        self.max_players = max_players
+        self._idle_players = []
+        # 持有者 -> 播放器，按最近使用时间排序（最前面的最久未使用）
+        self._leases = OrderedDict()
+
+    @classmethod
+    def instance(cls) -> "VLCInstanceManager":
+        """获取进程内唯一的管理器"""
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    def media_new(self, path: str, *options: str) -> vlc.Media:
+        """创建媒体对象，options为 ":name=value" 形式的媒体选项"""
+        return self.vlc_instance.media_new(path, *options)
+
+    def acquire(self, owner) -> vlc.MediaPlayer:
+        """为持有者借出一个播放器
+
+        owner 需实现 revoke_player()，在被抢占时停止播放并调用 release(owner)；
+        可提供 is_playing 属性，池满时优先抢占已暂停的持有者。
+        """
+        if owner in self._leases:
+            self._leases.move_to_end(owner)
+            return self._leases[owner]
+
+        if not self._idle_players and len(self._leases) >= self.max_players:
+            # 池已满，抢占最久未使用的暂停中持有者，都在播放时才抢占最久未使用的
+            victim = next((holder for holder in self._leases if not getattr(holder, "is_playing", False)),
+                          next(iter(self._leases)))
+            victim.revoke_player()
+            if victim in self._leases:
+                self.release(victim)
+
+        if self._idle_players:
+            player = self._idle_players.pop()
+        else:
+            player = self.vlc_instance.media_player_new()
+        self._leases[owner] = player
+        return player
+
+    def touch(self, owner):
+        """标记持有者最近使用过播放器"""
+        if owner in self._leases:
+            self._leases.move_to_end(owner)
+
+    def release(self, owner):
+        """归还播放器到空闲池"""
+        player = self._leases.pop(owner, None)
+        if player is None:
+            return
+        player.stop()
+        player.set_media(None)
+        bind_window(player, 0)
+        if len(self._idle_players) + len(self._leases) < self.max_players:
+            self._idle_players.append(player)
+        else:
+            player.release()
+
+    def shutdown(self):
+        """释放所有播放器和libvlc实例"""
+        for owner in list(self._leases):
+            owner.revoke_player()
+            self.release(owner)
+        for player in self._idle_players:
+            player.release()
+        self._idle_players.clear()
+        self.vlc_instance.release()
+
+
+def bind_window(player: vlc.MediaPlayer, win_id: int):
+    """将播放器的视频输出绑定到原生窗口（0表示解除绑定）"""
+    if platform.system() == "Windows":
+        player.set_hwnd(win_id)
+    elif platform.system() == "Darwin":  # macOS
+        player.set_nsobject(win_id)
+    else:  # Linux
+        player.set_xwindow(win_id)